@@ -0,0 +1,102 @@
+"""Offline latency benchmarks for the Dash callbacks.
+
+Runs every callback against the deterministic replay provider, so results are
+reproducible without network access:
+
+    python benchmarks/bench_callbacks.py                     # 1k, 10k, 100k, 1M bars
+    python benchmarks/bench_callbacks.py --sizes 1000 10000 --save baseline.json
+    python benchmarks/bench_callbacks.py --baseline baseline.json
+
+Each size uses its own ticker and a fresh bar store, and is timed cold (first
+call, empty caches) and warm (median of --repeat calls).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.environ.setdefault("STOCK_STORE_DIR", tempfile.mkdtemp(prefix="stock-bench-"))
+os.environ["STOCK_DATA_PROVIDER"] = "replay"
+os.environ["STOCK_SCHEDULER"] = "off"
+
+# Minute bars so even the largest size fits after HISTORY_START
+END = "2026-01-02"
+FREQ = "min"
+ZOOM = {"xaxis.range[0]": "2025-12-29 10:00:00", "xaxis.range[1]": "2025-12-30 15:00:00"}
+COMPARE_WITH = ["CMPA", "CMPB", "CMPC"]
+
+def _no_progress(*_):
+    pass
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    fn()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        warm.append(time.perf_counter() - start)
+    return cold, statistics.median(warm)
+
+def run(sizes, repeat):
+    from utils.providers import ReplayProvider, set_provider
+    from utils.data import get_history
+    from utils.figures import handle_yrange
+    from utils.range_index import range_index
+    import app
+
+    results = {}
+    for size in sizes:
+        set_provider(ReplayProvider(periods=size, end=END, freq=FREQ))
+        ticker = f"BENCH{size}"
+        compare = [f"{t}{size}" for t in COMPARE_WITH]
+        cases = {
+            "render_tab[overview]": lambda: app.render_tab("overview", ticker),
+            "render_tab[charts]": lambda: app.render_tab("charts", ticker),
+            "update_chart": lambda: app.update_chart(_no_progress, ticker, ["MA50", "MA200"], None),
+            "update_chart[zoomed]": lambda: app.update_chart(_no_progress, ticker, ["MA50", "MA200"], ZOOM),
+            "update_overview_graph": lambda: app.update_overview_graph(_no_progress, ticker, None),
+            "update_compare_chart": lambda: app.update_compare_chart(ticker, compare),
+            "handle_yrange[scan]": lambda: handle_yrange(get_history(ticker), ZOOM),
+            "handle_yrange[index]": lambda: handle_yrange(
+                get_history(ticker), ZOOM, range_index(ticker, get_history(ticker))),
+        }
+        results[size] = {name: _time(fn, repeat) for name, fn in cases.items()}
+    return results
+
+def report(results, baseline=None):
+    print(f"{'bars':>9}  {'case':<24} {'cold ms':>10} {'warm ms':>10} {'vs base':>9}")
+    for size, cases in results.items():
+        for name, (cold, warm) in cases.items():
+            delta = ""
+            base = (baseline or {}).get(str(size), {}).get(name)
+            if base:
+                delta = f"{warm / base[1]:.2f}x"
+            print(f"{size:>9}  {name:<24} {cold * 1e3:>10.2f} {warm * 1e3:>10.2f} {delta:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as JSON (a baseline for later runs)")
+    parser.add_argument("--baseline", help="JSON from a previous --save to compare warm timings against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = run(args.sizes, args.repeat)
+    report(results, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({str(k): v for k, v in results.items()}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
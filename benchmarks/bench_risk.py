@@ -0,0 +1,67 @@
+"""Risk analytics benchmark across a universe of tickers.
+
+Runs utils.risk.risk_analytics (returns matrix, annualized return and volatility,
+max drawdown, Sharpe, full and rolling beta, correlation matrix) on replay bars:
+
+    python benchmarks/bench_risk.py                          # 100 and 500 tickers, 10 years
+    python benchmarks/bench_risk.py --tickers 1000 --years 5
+
+Timed three ways: cold (bars fetched from the replay provider and stored), cached
+bars (analytics recomputed from the history cache), and warm (analytics cached).
+Also reports the history cache's size, bounded by STOCK_HISTORY_CACHE_MB.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.environ.setdefault("STOCK_STORE_DIR", tempfile.mkdtemp(prefix="stock-bench-"))
+os.environ["STOCK_DATA_PROVIDER"] = "replay"
+os.environ["STOCK_SCHEDULER"] = "off"
+
+END = "2026-01-02"
+TRADING_DAYS = 252
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def run(universes, years, benchmark):
+    import pandas as pd
+    from utils.data import HISTORY_CACHE
+    from utils.providers import ReplayProvider, set_provider
+    from utils.risk import RISK_CACHE, risk_analytics
+
+    set_provider(ReplayProvider(periods=years * TRADING_DAYS + 10, end=END, freq="B"))
+    start = str((pd.Timestamp(END) - pd.DateOffset(years=years)).date())
+    results = {}
+    for size in universes:
+        tickers = [f"U{size}X{i}" for i in range(size)]
+        run_once = lambda: risk_analytics(tickers, benchmark=benchmark, start=start)  # noqa: E731
+        cold, analytics = _timed(run_once)
+        RISK_CACHE.clear()
+        cached_bars, _ = _timed(run_once)
+        warm, _ = _timed(run_once)
+        results[size] = (len(analytics["stats"]), cold, cached_bars, warm, HISTORY_CACHE.nbytes)
+    return results
+
+def report(results, years):
+    print(f"{'tickers':>8} {'years':>6} {'cold ms':>10} {'cached bars ms':>15} {'warm ms':>9} {'cache MB':>9}")
+    for size, (count, cold, cached_bars, warm, nbytes) in results.items():
+        print(f"{count:>8} {years:>6} {cold * 1e3:>10.1f} {cached_bars * 1e3:>15.1f} {warm * 1e3:>9.2f}"
+              f" {nbytes / 2 ** 20:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--benchmark", default="SPY")
+    args = parser.parse_args()
+    report(run(args.tickers, args.years, args.benchmark), args.years)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cold-start benchmark for the Dash app, with an import-time budget check.
+
+Every run is a fresh interpreter, so nothing is warm from a previous run:
+
+    python benchmarks/bench_startup.py                    # 5 runs, 1000 ms import budget
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 600
+
+Reports the median of each startup phase: `import app`, `create_app()`, the first
+page load and the first chart callback (which pays for the deferred data stack).
+Exits non-zero when `import app` goes over --budget-ms, or when it eagerly imports
+one of the DEFERRED modules, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded on first use, never by `import app`
+DEFERRED = ["pandas", "numpy", "yfinance", "yahooquery", "utils.data", "utils.providers"]
+PHASES = ["import app", "create_app", "first page", "first chart"]
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+eager = [m for m in {deferred!r} if m in sys.modules]
+dash_app = app.create_app(scheduler=False)
+created = time.perf_counter()
+dash_app.server.test_client().get("/")
+page = time.perf_counter()
+app.update_chart(lambda *_: None, "STARTUP", [], None)
+chart = time.perf_counter()
+print(json.dumps({{"import app": imported - start, "create_app": created - imported,
+                  "first page": page - created, "first chart": chart - page, "eager": eager}}))
+"""
+
+def _run_once(store_dir):
+    env = dict(os.environ, STOCK_STORE_DIR=store_dir, STOCK_DATA_PROVIDER="replay",
+               STOCK_SCHEDULER="off", STOCK_CACHE_BACKEND="memory")
+    code = CHILD.format(src=os.path.join(ROOT, "src"), deferred=DEFERRED)
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=os.path.join(ROOT, "src"),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run(runs):
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="stock-startup-") as store_dir:
+            samples.append(_run_once(store_dir))
+    medians = {phase: statistics.median(s[phase] for s in samples) for phase in PHASES}
+    eager = sorted({m for s in samples for m in s["eager"]})
+    return medians, eager
+
+def report(medians, eager):
+    print(f"{'phase':<14} {'median ms':>10}")
+    for phase in PHASES:
+        print(f"{phase:<14} {medians[phase] * 1e3:>10.1f}")
+    print(f"{'ready':<14} {(medians['import app'] + medians['create_app']) * 1e3:>10.1f}")
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="fail when `import app` takes longer")
+    args = parser.parse_args()
+
+    medians, eager = run(args.runs)
+    report(medians, eager)
+    over = medians["import app"] * 1e3 > args.budget_ms
+    if over:
+        print(f"`import app` over budget: {medians['import app'] * 1e3:.1f} ms > {args.budget_ms:.0f} ms")
+    sys.exit(1 if over or eager else 0)
+
+if __name__ == "__main__":
+    main()
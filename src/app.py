@@ -1,60 +1,77 @@
+import os
 import dash
-from dash import dcc, html, Output, Input, State, ALL, no_update
+from dash import dash_table, dcc, html, Output, Input, State, ALL, Patch, no_update
 import plotly.graph_objs as go
 
-# Local imports
-from utils.data import fetch_metrics, get_history
-from utils.figures import empty_fig, handle_yrange
-from charts.candlestick import create_candlestick
-from components.stock_dropdown import StockDropdown, SEARCH_CACHE, DEFAULT_STOCKS
+# Local imports. Only the light ones are imported here: the data, indicator and chart
+# modules (pandas, numpy) load on first use inside the callbacks, so a worker can
+# serve its first page before the data stack is imported.
+from components.stock_dropdown import StockDropdown, DEFAULT_STOCKS, build_options
+from utils.search import symbol_label
+from utils.scheduler import start_scheduler
+from utils.instrumentation import instrumented, record_error, register_metrics, stage
+from utils.background import background_callback, background_manager
 
-from yahooquery import search
-
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
-app.title = "Stock Tracker"
+# A tab switch abandons the jobs still building the previous tab
+CANCEL_ON_TAB = [Input("page-tabs", "value")]
 
 # Lookup dictionary for defaults
 DEFAULT_LABEL_LOOKUP = {s["value"]: s["label"] for s in DEFAULT_STOCKS}
 
-# Main dropdown
-main_dropdown = StockDropdown(app, component_id="display-ticker-dropdown")
+def label_for(ticker):
+    return DEFAULT_LABEL_LOOKUP.get(ticker) or symbol_label(ticker, ticker)
 
-# Layout
-app.layout = html.Div([
-    html.H1("Stock Tracker", className="app-title"),
+# Callbacks are declared with @callback and registered on each app create_app() builds;
+# background=True ones run as background jobs when a manager is available
+CALLBACKS = []
+
+def callback(*dependencies, **kwargs):
+    def decorator(fn):
+        CALLBACKS.append((fn, dependencies, kwargs))
+        return fn
+    return decorator
 
-    html.Div([
-        html.Div([main_dropdown.render()], className="top-left"),
+# Layout
+def app_layout(main_dropdown):
+    return html.Div([
+        html.H1("Stock Tracker", className="app-title"),
 
         html.Div([
-            dcc.Tabs(
-                id="page-tabs", value="charts",
-                children=[
-                    dcc.Tab(label="Overview", value="overview", className="tab", selected_className="tab--selected"),
-                    dcc.Tab(label="Charts", value="charts", className="tab", selected_className="tab--selected"),
-                    dcc.Tab(label="Compare", value="compare", className="tab", selected_className="tab--selected"),
-                    dcc.Tab(label="Dividends", value="dividends", className="tab", selected_className="tab--selected"),
-                    dcc.Tab(label="History", value="history", className="tab", selected_className="tab--selected"),
-                ], className="tabs"
-            )
-        ], className="top-right"),
-    ], className="top-card"),
-
-    html.Div(id="page-content"),
-], className="app-container")
+            html.Div([main_dropdown.render()], className="top-left"),
+
+            html.Div([
+                dcc.Tabs(
+                    id="page-tabs", value="charts",
+                    children=[
+                        dcc.Tab(label="Overview", value="overview", className="tab", selected_className="tab--selected"),
+                        dcc.Tab(label="Charts", value="charts", className="tab", selected_className="tab--selected"),
+                        dcc.Tab(label="Compare", value="compare", className="tab", selected_className="tab--selected"),
+                        dcc.Tab(label="Dividends", value="dividends", className="tab", selected_className="tab--selected"),
+                        dcc.Tab(label="History", value="history", className="tab", selected_className="tab--selected"),
+                    ], className="tabs"
+                )
+            ], className="top-right"),
+        ], className="top-card"),
+
+        html.Div(id="page-content"),
+        # Compare tickers currently drawn; outlives the Compare tab so Dividends can use them
+        dcc.Store(id="compare-selection", data=[]),
+    ], className="app-container")
 
 # ------------------ Tab rendering ------------------
-@app.callback(
+@callback(
     Output("page-content", "children"),
     Input("page-tabs", "value"),
     Input("display-ticker-dropdown", "value")
 )
+@instrumented
 def render_tab(tab, ticker):
     if tab == "overview":
         return html.Div([
             html.Div([
                 html.Div([
                     html.H3("Key Metrics", className="section-label"),
+                    html.Div(id="metrics-stale", className="stale-note"),
                     html.Div([
                         html.Div([
                             html.Div([html.Span("PE Ratio", className="metric-label"),
@@ -98,36 +115,44 @@ def render_tab(tab, ticker):
 
                 html.Div([
                     html.H3("Close Price History", className="section-label"),
+                    html.Div(id="overview-status", className="chart-status", style={"visibility": "hidden"}),
+                    html.Div(id="overview-stale", className="stale-note"),
                     dcc.Loading(
                         id="loading-overview-graph",
                         type="circle",
                         children=dcc.Graph(id="overview-close-graph", className="overview-graph")
-                    )
+                    ),
+                    dcc.Store(id="overview-close-window")
                 ], className="overview-right card"),
             ], className="overview-container")
         ])
 
     elif tab == "charts":
+        from charts.candlestick import OVERLAYS
         return html.Div([
             html.Div([
                 html.Label("Display Options:", className="section-label"),
                 dcc.Checklist(
                     id="display-options",
-                    options=[{"label": "MA50", "value": "MA50"}, {"label": "MA200", "value": "MA200"}],
+                    options=[{"label": spec[0], "value": key} for key, spec in OVERLAYS.items()],
                     value=[],
                     className="checklist"
                 )
             ], className="card"),
             html.Div([
+                html.Div(id="stock-chart-status", className="chart-status", style={"visibility": "hidden"}),
+                html.Div(id="stock-chart-stale", className="stale-note"),
                 dcc.Loading(
                     id="loading-stock-chart",
                     type="circle",
                     children=dcc.Graph(id="stock-chart", className="stock-graph")
-                )
+                ),
+                dcc.Store(id="stock-chart-window")
             ], className="card")
         ])
 
     elif tab == "compare":
+        from utils.risk import BENCHMARK, RISK_COLUMNS
         return html.Div([
             html.Div([
                 html.Label("Select stocks to compare", className="section-label"),
@@ -135,6 +160,11 @@ def render_tab(tab, ticker):
                     html.Div(id="compare-dropdown-container", className="compare-dropdowns"),
                     html.Button("Add Stock", id="add-stock-btn", n_clicks=0, className="add-stock-btn")
                 ], className="compare-row"),
+                html.Div([
+                    dcc.Textarea(id="compare-watchlist", className="compare-watchlist",
+                                 placeholder="Or paste a watchlist: AAPL, MSFT, NVDA ..."),
+                    html.Button("Compare list", id="compare-watchlist-btn", n_clicks=0, className="add-stock-btn")
+                ], className="compare-row"),
             ], className="card compare-options"),
 
             html.Div([
@@ -142,21 +172,69 @@ def render_tab(tab, ticker):
                     id="loading-compare-chart",
                     type="circle",
                     children=dcc.Graph(id="compare-chart", className="stock-graph"),
+                ),
+                dcc.Store(id="compare-chart-tickers")
+            ], className="card"),
+
+            html.Div([
+                html.H3(f"Risk & Return (beta vs {BENCHMARK})", className="section-label"),
+                dash_table.DataTable(
+                    id="risk-table",
+                    columns=[{"name": c, "id": c, "type": "text" if c == "Ticker" else "numeric"} for c in RISK_COLUMNS],
+                    sort_action="native",
+                    page_size=25,
+                    style_table={"overflowX": "auto"},
+                    style_header={"backgroundColor": "#222", "color": "white", "fontWeight": "bold"},
+                    style_cell={"backgroundColor": "#111", "color": "white", "border": "1px solid #333",
+                                "fontFamily": "inherit", "padding": "6px"},
                 )
             ], className="card"),
+            html.Div([
+                html.H3("Return Correlation", className="section-label"),
+                dcc.Loading(
+                    id="loading-correlation",
+                    type="circle",
+                    children=dcc.Graph(id="correlation-heatmap", className="stock-graph"),
+                ),
+            ], className="card"),
         ])
 
     elif tab == "dividends":
-        return html.Div([html.Div([html.H3("Dividends coming soon...", className="section-label")], className="card")])
+        from utils.actions import SUMMARY_COLUMNS as DIVIDEND_COLUMNS
+        return html.Div([
+            html.Div([
+                html.H3("Trailing Yield", className="section-label"),
+                dcc.Loading(
+                    id="loading-dividends-yield",
+                    type="circle",
+                    children=dcc.Graph(id="dividends-yield-chart", className="stock-graph")
+                ),
+            ], className="card"),
+            html.Div([
+                html.H3("Annual Dividends", className="section-label"),
+                dcc.Graph(id="dividends-annual-chart", className="stock-graph"),
+            ], className="card"),
+            html.Div([
+                dash_table.DataTable(
+                    id="dividends-table",
+                    columns=[{"name": c, "id": c} for c in DIVIDEND_COLUMNS],
+                    style_table={"overflowX": "auto"},
+                    style_header={"backgroundColor": "#222", "color": "white", "fontWeight": "bold"},
+                    style_cell={"backgroundColor": "#111", "color": "white", "border": "1px solid #333",
+                                "fontFamily": "inherit", "padding": "6px"},
+                )
+            ], className="card"),
+        ])
 
     elif tab == "history":
-        return html.Div([html.Div([html.H3("History coming soon...", className="section-label")], className="card")])
+        from components.history_table import history_layout
+        return history_layout()
 
     return html.Div()
 
 # ------------------ Callbacks ------------------
 # Overview metrics
-@app.callback(
+@callback(
     Output("pe-ratio", "children"),
     Output("beta", "children"),
     Output("volume", "children"),
@@ -166,32 +244,44 @@ def render_tab(tab, ticker):
     Output("earnings-date", "children"),
     Output("week52-low", "children"),
     Output("week52-high", "children"),
-    Input("display-ticker-dropdown", "value")
+    Output("metrics-stale", "children"),
+    Input("display-ticker-dropdown", "value"),
+    cancel=CANCEL_ON_TAB,
+    background=True
 )
+@instrumented
 def update_overview_metrics(ticker_symbol):
     if not ticker_symbol:
-        return [""] * 9
+        return [""] * 10
     try:
-        metrics = fetch_metrics(ticker_symbol)
+        from utils.data import fetch_metrics
+        from utils.gateway import stale_message, stale_notes
+        with stale_notes() as stale:
+            metrics = fetch_metrics(ticker_symbol)
         return [
             metrics["pe"], metrics["beta"], metrics["volume"], metrics["open"],
             metrics["last_close"], metrics["dividend_date"], metrics["earnings_date"],
-            metrics["week52_low"], metrics["week52_high"]
+            metrics["week52_low"], metrics["week52_high"], stale_message(stale)
         ]
     except Exception:
-        return ["N/A"] * 9
+        record_error("update_overview_metrics")
+        return ["N/A"] * 9 + [""]
 
 # Analyst opinion
-@app.callback(
+@callback(
     Output("analyst-opinion", "children"),
     Output("analyst-opinion", "style"),
     Output("analyst-opinion-container", "style"),
-    Input("display-ticker-dropdown", "value")
+    Input("display-ticker-dropdown", "value"),
+    cancel=CANCEL_ON_TAB,
+    background=True
 )
+@instrumented
 def update_analyst_opinion(ticker_symbol):
     if not ticker_symbol:
         return "", {}, {}
     try:
+        from utils.data import fetch_metrics
         metrics = fetch_metrics(ticker_symbol)
         opinion = metrics["analyst"].upper()
         colors = {
@@ -214,57 +304,158 @@ def update_analyst_opinion(ticker_symbol):
         }
         return opinion.replace("_", " "), text_style, border_style
     except Exception:
+        record_error("update_analyst_opinion")
         return "N/A", {"color": "white", "text-align": "center"}, {"border": "2px solid #555"}
 
 # Overview graph
-@app.callback(
-    Output("overview-close-graph", "figure"),
-    Input("display-ticker-dropdown", "value"),
-    Input("overview-close-graph", "relayoutData")
-)
-def update_overview_graph(ticker_symbol, relayoutData):
-    if not ticker_symbol:
-        return go.Figure()
-    try:
-        hist = get_history(ticker_symbol)
-        if hist.empty:
-            return empty_fig("Overview", "No data")
+def overview_figure(ticker_symbol, interval, hist, relayoutData):
+    from utils.data import series_key
+    from utils.downsample import downsample_line
+    from utils.figures import handle_yrange
+    from utils.range_index import range_index
+    with stage("compute", chart="overview"):
+        close = downsample_line(hist["Close"], relayoutData)
+        yrange = handle_yrange(hist, relayoutData, range_index(series_key(ticker_symbol, interval), hist))
+    with stage("figure", chart="overview"):
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-            x=hist.index, y=hist["Close"],
+            x=close.index, y=close,
             fill="tozeroy", line=dict(color="cyan", width=2), name="Close"
         ))
         fig.update_layout(
             template="plotly_dark",
             margin=dict(l=20, r=20, t=30, b=20),
             xaxis=dict(type="date"),
-            yaxis=dict(range=handle_yrange(hist, relayoutData)),
+            yaxis=dict(range=yrange),
             uirevision="overview"
         )
-        return fig
+    return fig
+
+@callback(
+    Output("overview-close-graph", "figure"),
+    Output("overview-close-window", "data"),
+    Output("overview-stale", "children"),
+    Input("display-ticker-dropdown", "value"),
+    State("overview-close-graph", "relayoutData"),
+    progress=Output("overview-status", "children"),
+    running=[(Output("overview-status", "style"), {"visibility": "visible"}, {"visibility": "hidden"})],
+    cancel=CANCEL_ON_TAB,
+    background=True
+)
+@instrumented
+def update_overview_graph(set_progress, ticker_symbol, relayoutData):
+    if not ticker_symbol:
+        return go.Figure(), None, ""
+    from utils.data import view_history
+    from utils.downsample import window_state
+    from utils.figures import empty_fig
+    from utils.figure_cache import cached_figure, figure_key
+    from utils.gateway import stale_message, stale_notes
+    try:
+        set_progress(f"Fetching {ticker_symbol}…")
+        with stage("fetch", chart="overview"), stale_notes() as stale:
+            interval, hist = view_history(ticker_symbol, relayoutData)
+        if hist.empty:
+            return empty_fig("Overview", "No data"), None, ""
+        set_progress("Building chart…")
+        key = figure_key("overview", ticker_symbol, interval, hist, relayoutData)
+        fig = cached_figure(key, lambda: overview_figure(ticker_symbol, interval, hist, relayoutData))
+        return fig, {**window_state(hist.index, relayoutData), "interval": interval}, stale_message(stale)
+    except Exception:
+        record_error("update_overview_graph")
+        return empty_fig("Overview", "Error fetching data"), None, ""
+
+# Overview zoom/pan: partial update of the axis range (and the trace only when needed);
+# bars load through view_history() as in zoom_candlestick(), so a memo miss may hit disk or upstream
+@callback(
+    Output("overview-close-graph", "figure", allow_duplicate=True),
+    Output("overview-close-window", "data", allow_duplicate=True),
+    Input("overview-close-graph", "relayoutData"),
+    State("display-ticker-dropdown", "value"),
+    State("overview-close-window", "data"),
+    prevent_initial_call=True
+)
+@instrumented
+def zoom_overview_graph(relayoutData, ticker_symbol, window):
+    from utils.data import series_key, view_history
+    from utils.downsample import downsample_line, is_xaxis_event, needs_refresh, window_state
+    from utils.figures import handle_yrange
+    from utils.range_index import range_index
+    if not ticker_symbol or not is_xaxis_event(relayoutData):
+        return no_update, no_update
+    try:
+        interval, hist = view_history(ticker_symbol, relayoutData)
+        if hist.empty:
+            return no_update, no_update
+        patched = Patch()
+        patched["layout"]["yaxis"]["range"] = handle_yrange(
+            hist, relayoutData, range_index(series_key(ticker_symbol, interval), hist))
+        if (window or {}).get("interval", "1d") == interval and not needs_refresh(window, hist.index, relayoutData):
+            return patched, no_update
+        close = downsample_line(hist["Close"], relayoutData)
+        patched["data"][0]["x"] = close.index
+        patched["data"][0]["y"] = close
+        return patched, {**window_state(hist.index, relayoutData), "interval": interval}
     except Exception:
-        return empty_fig("Overview", "Error fetching data")
+        record_error("zoom_overview_graph")
+        return no_update, no_update
 
 # Candlestick chart
-@app.callback(
+@callback(
     Output("stock-chart", "figure"),
+    Output("stock-chart-window", "data"),
+    Output("stock-chart-stale", "children"),
     Input("display-ticker-dropdown", "value"),
     Input("display-options", "value"),
-    Input("stock-chart", "relayoutData")
+    State("stock-chart", "relayoutData"),
+    progress=Output("stock-chart-status", "children"),
+    running=[(Output("stock-chart-status", "style"), {"visibility": "visible"}, {"visibility": "hidden"})],
+    cancel=CANCEL_ON_TAB,
+    background=True
+)
+@instrumented
+def update_chart(set_progress, ticker_symbol, displayOptions, relayoutData):
+    if not ticker_symbol:
+        return no_update, no_update, no_update
+    from charts.candlestick import cached_candlestick, candlestick_window
+    from utils.data import view_history
+    from utils.gateway import stale_message, stale_notes
+    set_progress(f"Fetching {ticker_symbol}…")
+    label_with_ticker = f"{label_for(ticker_symbol)} ({ticker_symbol})"
+    with stale_notes() as stale:
+        # Loaded once for the figure, its cache key and the window (and counted once as a request)
+        try:
+            view = view_history(ticker_symbol, relayoutData)
+        except Exception:
+            view = None
+        fig = cached_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions, view)
+        window = candlestick_window(ticker_symbol, relayoutData, view)
+    return fig, window, stale_message(stale)
+
+# Candlestick zoom/pan
+@callback(
+    Output("stock-chart", "figure", allow_duplicate=True),
+    Output("stock-chart-window", "data", allow_duplicate=True),
+    Input("stock-chart", "relayoutData"),
+    State("display-ticker-dropdown", "value"),
+    State("display-options", "value"),
+    State("stock-chart-window", "data"),
+    prevent_initial_call=True
 )
-def update_chart(ticker_symbol, displayOptions, relayoutData):
+@instrumented
+def zoom_chart(relayoutData, ticker_symbol, displayOptions, window):
     if not ticker_symbol:
-        return no_update
-    label = DEFAULT_LABEL_LOOKUP.get(ticker_symbol) or SEARCH_CACHE.get(ticker_symbol) or ticker_symbol
-    label_with_ticker = f"{label} ({ticker_symbol})"
-    return create_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions)
+        return no_update, no_update
+    from charts.candlestick import zoom_candlestick
+    return zoom_candlestick(ticker_symbol, relayoutData, displayOptions, window)
 
 # Add dynamic compare dropdowns
-@app.callback(
+@callback(
     Output("compare-dropdown-container", "children"),
     Input("add-stock-btn", "n_clicks"),
     State("compare-dropdown-container", "children")
 )
+@instrumented
 def add_compare_dropdown(n_clicks, children):
     if children is None:
         children = []
@@ -284,89 +475,142 @@ def add_compare_dropdown(n_clicks, children):
 
 
 # Compare dropdown search callback
-@app.callback(
+@callback(
     Output({"type": "compare-dropdown", "index": ALL}, "options"),
     Input({"type": "compare-dropdown", "index": ALL}, "search_value"),
     Input({"type": "compare-dropdown", "index": ALL}, "value")
 )
+@instrumented
 def update_compare_options(search_values, selected_values):
-    output_options = []
-
-    for i, search_value in enumerate(search_values):
-        options = []
-
-        # Search via YahooQuery
-        if search_value:
-            try:
-                results = search(search_value, first_quote=False, quotes_count=10).get("quotes", [])[:10]
-                for q in results:
-                    sym = q.get("symbol")
-                    if not sym:
-                        continue
-                    label = q.get("shortname") or q.get("shortName") or sym
-                    SEARCH_CACHE[sym] = label
-                    options.append({"label": f"{label} ({sym})", "value": sym})
-            except Exception:
-                pass
-
-        # Add default stocks if not already included
-        existing_values = [opt["value"] for opt in options]
-        default_options = [
-            {"label": f"{s['label']} ({s['value']})", "value": s["value"]}
-            for s in DEFAULT_STOCKS if s["value"] not in existing_values
-        ]
-
-        # Keep selected value visible
-        sel_val = selected_values[i] if selected_values else None
-        if sel_val and sel_val not in [opt["value"] for opt in options + default_options]:
-            label = SEARCH_CACHE.get(sel_val, sel_val)
-            options.append({"label": f"{label} ({sel_val})", "value": sel_val})
-
-        output_options.append(options + default_options)
+    return [
+        build_options(search_value, selected_values[i] if selected_values else None)
+        for i, search_value in enumerate(search_values)
+    ]
 
-    return output_options
 
-
-# Compare chart update (main stock + all compare dropdowns)
-@app.callback(
+# Compare chart update (main stock + all compare dropdowns + the pasted watchlist)
+@callback(
     Output("compare-chart", "figure"),
+    Output("compare-chart-tickers", "data"),
+    Output("compare-selection", "data"),
     Input("display-ticker-dropdown", "value"),
-    Input({"type": "compare-dropdown", "index": ALL}, "value")
+    Input({"type": "compare-dropdown", "index": ALL}, "value"),
+    Input("compare-watchlist-btn", "n_clicks"),
+    State("compare-watchlist", "value"),
+    State("compare-chart-tickers", "data")
 )
-def update_compare_chart(main_ticker, compare_tickers):
-    tickers = [main_ticker] if main_ticker else []
-    if compare_tickers:
-        tickers += [t for t in compare_tickers if t]
-
+@instrumented
+def update_compare_chart(main_ticker, compare_tickers, n_clicks=0, watchlist=None, drawn=None):
+    from charts.compare import compare_figure, compare_patch, parse_watchlist, selected_tickers
+    tickers = selected_tickers(main_ticker, (compare_tickers or []) + parse_watchlist(watchlist))
+    selection = [t for t in tickers if t != main_ticker]
     if not tickers:
-        return go.Figure()
-
-    fig = go.Figure()
-    for ticker in tickers:
-        try:
-            hist = get_history(ticker)
-            if hist.empty:
-                continue
-            pct_change = ((hist["Close"] - hist["Close"].iloc[0]) / hist["Close"].iloc[0]) * 100
-            label = DEFAULT_LABEL_LOOKUP.get(ticker) or SEARCH_CACHE.get(ticker) or ticker
-            fig.add_trace(go.Scatter(
-                x=hist.index,
-                y=pct_change,
-                mode="lines",
-                name=f"{label} ({ticker})"
-            ))
-        except Exception:
-            continue
-
-    fig.update_layout(
-        template="plotly_dark",
-        margin=dict(l=20, r=20, t=30, b=20),
-        xaxis_title="Date",
-        yaxis_title="% Change",
-        legend_title="Stocks",
-        showlegend=True,
-    )
-    return fig
+        return go.Figure(), [], selection
+
+    # The figure (and its trace list) is rebuilt whenever the tab is; after that only
+    # the traces of added/removed tickers are sent
+    if not drawn:
+        return *compare_figure(tickers, label_for), selection
+    return *compare_patch(drawn, tickers, label_for), selection
+
+# Dividends: main ticker plus the Compare tickers, all from the stored bars
+@callback(
+    Output("dividends-yield-chart", "figure"),
+    Output("dividends-annual-chart", "figure"),
+    Output("dividends-table", "data"),
+    Input("display-ticker-dropdown", "value"),
+    Input("compare-selection", "data")
+)
+@instrumented
+def update_dividends(main_ticker, compare_tickers):
+    from charts.compare import selected_tickers
+    from charts.dividends import dividend_view
+    from utils.figures import empty_fig
+    tickers = selected_tickers(main_ticker, compare_tickers)
+    if not tickers:
+        return go.Figure(), go.Figure(), []
+    try:
+        return dividend_view(tickers, label_for)
+    except Exception:
+        record_error("update_dividends")
+        error = empty_fig("Dividends", "Error fetching data")
+        return error, error, []
+
+# Risk & return: ranked table and correlation heatmap for the main + Compare tickers
+@callback(
+    Output("correlation-heatmap", "figure"),
+    Output("risk-table", "data"),
+    Input("display-ticker-dropdown", "value"),
+    Input("compare-selection", "data")
+)
+@instrumented
+def update_risk(main_ticker, compare_tickers):
+    from charts.compare import selected_tickers
+    from charts.risk import risk_view
+    from utils.figures import empty_fig
+    tickers = selected_tickers(main_ticker, compare_tickers)
+    if not tickers:
+        return go.Figure(), []
+    try:
+        return risk_view(tickers)
+    except Exception:
+        record_error("update_risk")
+        return empty_fig("Correlation", "Error fetching data"), []
+
+# History table: one page of the stored bars per request
+@callback(
+    Output("history-table", "data"),
+    Output("history-table", "page_count"),
+    Output("history-table", "page_current"),
+    Input("display-ticker-dropdown", "value"),
+    Input("history-interval", "value"),
+    Input("history-table", "page_current"),
+    Input("history-table", "page_size"),
+    Input("history-table", "sort_by"),
+    Input("history-table", "filter_query")
+)
+@instrumented
+def update_history_table(ticker_symbol, interval, page_current, page_size, sort_by, filter_query):
+    if not ticker_symbol:
+        return [], 1, 0
+    try:
+        from components.history_table import history_page
+        return history_page(ticker_symbol, interval, page_current, page_size, sort_by, filter_query)
+    except Exception:
+        record_error("update_history_table")
+        return [], 1, 0
+
+# ------------------ App factory ------------------
+def create_app(scheduler=True):
+    app = dash.Dash(__name__, suppress_callback_exceptions=True)
+    app.title = "Stock Tracker"
+    # /metrics (Prometheus text), callback request timing and the optional STOCK_PROFILE profiler
+    register_metrics(app.server)
+    # Slow callbacks run as background jobs when the diskcache extras are installed (None: inline)
+    manager = background_manager()
+    for fn, dependencies, kwargs in CALLBACKS:
+        if kwargs.get("background"):
+            options = {k: v for k, v in kwargs.items() if k != "background"}
+            background_callback(app, manager, *dependencies, **options)(fn)
+        else:
+            app.callback(*dependencies, **kwargs)(fn)
+    app.layout = app_layout(StockDropdown(app, component_id="display-ticker-dropdown"))
+    # Warm caches for the default tickers and keep them fresh
+    if scheduler:
+        start_scheduler([s["value"] for s in DEFAULT_STOCKS])
+    return app
+
+_app = None
+
+def __getattr__(name):
+    # `app` and `server` (gunicorn app:server) are built on first access, not at import
+    global _app
+    if name in ("app", "server"):
+        if _app is None:
+            _app = create_app()
+        return _app if name == "app" else _app.server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # The debug reloader's parent process never serves requests, so it skips the scheduler
+    create_app(scheduler=os.environ.get("WERKZEUG_RUN_MAIN") == "true").run(debug=True)
@@ -1,10 +1,101 @@
 import plotly.graph_objs as go
-from utils.data import get_history
+from plotly.subplots import make_subplots
+from dash import Patch, no_update
+from utils.data import series_key, view_history
 from utils.figures import empty_fig, handle_yrange
+from utils.range_index import range_index
+from utils.indicators import indicator
+from utils.downsample import downsample_ohlc, is_xaxis_event, needs_refresh, window_state
+from utils.instrumentation import record_error, stage
+from utils.figure_cache import cached_figure, figure_key
+from utils.resample import INTRADAY
 
-def create_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions):
+# Checklist value -> (label, indicator, params, {output: line color}, panel).
+# "price" overlays share the candlestick axis; any other panel gets its own row below it.
+OVERLAYS = {
+    "MA50": ("MA50", "SMA", {"window": 50}, {"value": "blue"}, "price"),
+    "MA200": ("MA200", "SMA", {"window": 200}, {"value": "orange"}, "price"),
+    "EMA20": ("EMA20", "EMA", {"span": 20}, {"value": "magenta"}, "price"),
+    "BB": ("Bollinger", "BBANDS", {"window": 20, "k": 2.0},
+           {"upper": "gray", "middle": "lightgray", "lower": "gray"}, "price"),
+    "VWAP": ("VWAP", "VWAP", {}, {"value": "yellow"}, "price"),
+    "RSI": ("RSI", "RSI", {"period": 14}, {"value": "violet"}, "RSI"),
+    "MACD": ("MACD", "MACD", {}, {"macd": "cyan", "signal": "orange"}, "MACD"),
+    "ATR": ("ATR", "ATR", {"period": 14}, {"value": "lightgreen"}, "ATR"),
+}
+
+def _selected(displayOptions):
+    return [key for key in OVERLAYS if key in (displayOptions or [])]
+
+def _panels(displayOptions):
+    panels = []
+    for key in _selected(displayOptions):
+        panel = OVERLAYS[key][4]
+        if panel != "price" and panel not in panels:
+            panels.append(panel)
+    return panels
+
+def _with_overlays(ticker_symbol, data, displayOptions):
+    # Indicator values come from the engine's per-ticker cache; they are computed on
+    # full resolution and then bucketed with the candles
+    columns = {}
+    for key in _selected(displayOptions):
+        _, name, params, outputs, _ = OVERLAYS[key]
+        values = indicator(ticker_symbol, data, name, **params)
+        for output in outputs:
+            columns[f"{key}:{output}"] = values[output]
+    return data.assign(**columns)
+
+def _trace_data(ticker_symbol, data, relayoutData, displayOptions):
+    view = downsample_ohlc(_with_overlays(ticker_symbol, data, displayOptions), relayoutData)
+    arrays = [dict(x=view.index, open=view["Open"], high=view["High"], low=view["Low"], close=view["Close"])]
+    for key in _selected(displayOptions):
+        arrays += [dict(x=view.index, y=view[f"{key}:{output}"]) for output in OVERLAYS[key][3]]
+    return arrays
+
+def _trace_names(displayOptions, interval):
+    # Overlays are computed on the bars drawn: daily bars (bucketed when zoomed out) or,
+    # zoomed in far enough, intraday bars, whose overlays name their interval ("MA50 5m"
+    # averages 50 five-minute bars)
+    suffix = f" {interval}" if interval in INTRADAY else ""
+    names = ["Candlesticks"]
+    for key in _selected(displayOptions):
+        label, _, _, outputs, _ = OVERLAYS[key]
+        names += [(label if len(outputs) == 1 else f"{label} {output}") + suffix for output in outputs]
+    return names
+
+def _candlestick_figure(label_with_ticker, displayOptions, arrays, yrange, interval="1d"):
+    panels = _panels(displayOptions)
+    fig = make_subplots(rows=1 + len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.03,
+                        row_heights=[0.7] + [0.3 / len(panels)] * len(panels) if panels else None)
+    names = iter(_trace_names(displayOptions, interval))
+    fig.add_trace(go.Candlestick(**next(arrays), name=next(names)), row=1, col=1)
+    for key in _selected(displayOptions):
+        _, _, _, outputs, panel = OVERLAYS[key]
+        row = 1 if panel == "price" else 2 + panels.index(panel)
+        for color in outputs.values():
+            fig.add_trace(go.Scatter(**next(arrays), mode="lines",
+                                     line=dict(color=color, width=1.5), name=next(names)), row=row, col=1)
+    for i, panel in enumerate(panels):
+        fig.update_yaxes(title_text=panel, row=2 + i, col=1)
+
+    fig.update_layout(
+        template="plotly_dark",
+        title=f"{label_with_ticker} Candlestick Chart",
+        xaxis=dict(type="date", rangeslider=dict(visible=False)),
+        yaxis=dict(range=yrange),
+        margin=dict(l=20, r=20, t=50, b=40),
+        uirevision="candles",
+        showlegend=True,
+    )
+    return fig
+
+# `view` is the (interval, bars) pair of view_history() when the caller already loaded it
+def create_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions, view=None):
     try:
-        data = get_history(ticker_symbol)
+        with stage("fetch", chart="candlestick"):
+            interval, data = view if view is not None else view_history(ticker_symbol, relayoutData)
+            key = series_key(ticker_symbol, interval)
         if data.empty:
             return empty_fig(label_with_ticker, f"No data for {ticker_symbol}")
 
@@ -12,31 +103,59 @@ def create_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOp
             if col not in data.columns:
                 return empty_fig(label_with_ticker, f"No {col} data")
 
-        traces = [go.Candlestick(
-            x=data.index, open=data["Open"], high=data["High"],
-            low=data["Low"], close=data["Close"], name="Candlesticks"
-        )]
-
-        if "MA50" in displayOptions:
-            data["MA50"] = data["Close"].rolling(50).mean()
-            traces.append(go.Scatter(x=data.index, y=data["MA50"], mode="lines",
-                                     line=dict(color="blue", width=1.5), name="MA50"))
-        if "MA200" in displayOptions:
-            data["MA200"] = data["Close"].rolling(200).mean()
-            traces.append(go.Scatter(x=data.index, y=data["MA200"], mode="lines",
-                                     line=dict(color="orange", width=1.5), name="MA200"))
-
-        return go.Figure(
-            data=traces,
-            layout=go.Layout(
-                template="plotly_dark",
-                title=f"{label_with_ticker} Candlestick Chart",
-                xaxis=dict(type="date", rangeslider=dict(visible=False)),
-                yaxis=dict(range=handle_yrange(data, relayoutData)),
-                margin=dict(l=20, r=20, t=50, b=40),
-                uirevision="candles",
-                showlegend=True,
-            )
-        )
+        with stage("compute", chart="candlestick"):
+            arrays = iter(_trace_data(key, data, relayoutData, displayOptions))
+            yrange = handle_yrange(data, relayoutData, range_index(key, data))
+
+        with stage("figure", chart="candlestick"):
+            return _candlestick_figure(label_with_ticker, displayOptions, arrays, yrange, interval)
     except Exception:
+        record_error("create_candlestick")
         return empty_fig(label_with_ticker, f"Error fetching {ticker_symbol}")
+
+def cached_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions, view=None):
+    # create_candlestick, served pre-serialized when this exact view was built already
+    try:
+        interval, data = view if view is not None else view_history(ticker_symbol, relayoutData)
+    except Exception:
+        return create_candlestick(ticker_symbol, label_with_ticker, relayoutData, displayOptions)
+    key = figure_key("candlestick", ticker_symbol, interval, data, relayoutData,
+                     label_with_ticker, tuple(_selected(displayOptions)))
+    return cached_figure(key, lambda: create_candlestick(ticker_symbol, label_with_ticker, relayoutData,
+                                                         displayOptions, (interval, data)))
+
+def candlestick_window(ticker_symbol, relayoutData, view=None):
+    try:
+        interval, data = view if view is not None else view_history(ticker_symbol, relayoutData)
+        return {**window_state(data.index, relayoutData), "interval": interval}
+    except Exception:
+        return None
+
+# Zoom/pan: patch the y-axis range, and the trace arrays only if the data already on the
+# client doesn't cover the new view or the view calls for another bar interval. Bars come
+# from view_history(): usually the per-process memo, but a memo miss (expired, evicted,
+# another worker, a newly needed intraday interval) reads the store, and a stale or
+# missing partition downloads from upstream like any other history request.
+def zoom_candlestick(ticker_symbol, relayoutData, displayOptions, window):
+    if not is_xaxis_event(relayoutData):
+        return no_update, no_update
+    try:
+        interval, data = view_history(ticker_symbol, relayoutData)
+        if data.empty:
+            return no_update, no_update
+        key = series_key(ticker_symbol, interval)
+        patched = Patch()
+        patched["layout"]["yaxis"]["range"] = handle_yrange(data, relayoutData, range_index(key, data))
+        if (window or {}).get("interval", "1d") == interval and not needs_refresh(window, data.index, relayoutData):
+            return patched, no_update
+        with stage("compute", chart="candlestick-zoom"):
+            arrays = _trace_data(key, data, relayoutData, displayOptions)
+        names = _trace_names(displayOptions, interval)
+        for i, trace in enumerate(arrays):
+            for prop, values in trace.items():
+                patched["data"][i][prop] = values
+            patched["data"][i]["name"] = names[i]
+        return patched, {**window_state(data.index, relayoutData), "interval": interval}
+    except Exception:
+        record_error("zoom_candlestick")
+        return no_update, no_update
@@ -0,0 +1,79 @@
+import re
+import plotly.graph_objs as go
+from dash import Patch, no_update
+from utils.data import get_histories
+from utils.instrumentation import stage
+
+def selected_tickers(main_ticker, compare_values):
+    tickers = [main_ticker] if main_ticker else []
+    tickers += [t for t in compare_values or [] if t]
+    return list(dict.fromkeys(tickers))
+
+# Symbols as Yahoo writes them: BRK-B, RDS.A, ^GSPC, EURUSD=X
+SYMBOL = re.compile(r"[A-Z0-9.\-^=]{1,15}")
+
+def parse_watchlist(text):
+    # A pasted list of symbols, separated by commas, semicolons, spaces or new lines
+    symbols = (s.upper() for s in re.split(r"[\s,;]+", text or "") if s)
+    return [s for s in dict.fromkeys(symbols) if SYMBOL.fullmatch(s)]
+
+def normalize(closes):
+    # Every column rebased on its own first available close, in one vectorized step
+    return (closes / closes.bfill().iloc[0] - 1) * 100
+
+def _trace(ticker, pct_change, label):
+    # WebGL lines keep 20+ long series responsive
+    return go.Scattergl(
+        x=pct_change.index,
+        y=pct_change.to_numpy(),
+        mode="lines",
+        connectgaps=True,
+        name=f"{label} ({ticker})",
+        uid=ticker,
+    )
+
+def compare_figure(tickers, label_for):
+    # Full build: one aligned price matrix for every ticker. Returns the figure and the
+    # tickers drawn, in trace order, which compare_patch needs for later edits.
+    fig = go.Figure()
+    drawn = []
+    with stage("fetch", chart="compare"):
+        closes = get_histories(tickers)
+    if not closes.empty:
+        with stage("compute", chart="compare"):
+            pct_change = normalize(closes)
+        for ticker in pct_change.columns:
+            fig.add_trace(_trace(ticker, pct_change[ticker], label_for(ticker)))
+            drawn.append(ticker)
+
+    fig.update_layout(
+        template="plotly_dark",
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis_title="Date",
+        yaxis_title="% Change",
+        legend_title="Stocks",
+        showlegend=True,
+    )
+    return fig, drawn
+
+def compare_patch(drawn, tickers, label_for):
+    # Adding/removing a dropdown only touches that trace: removed tickers are deleted
+    # by position, new ones fetched on their own and appended
+    removed = [i for i, t in enumerate(drawn) if t not in tickers]
+    added = [t for t in tickers if t not in drawn]
+    if not removed and not added:
+        return no_update, no_update
+
+    patched = Patch()
+    for i in reversed(removed):
+        del patched["data"][i]
+    drawn = [t for t in drawn if t in tickers]
+
+    with stage("fetch", chart="compare"):
+        closes = get_histories(added)
+    if not closes.empty:
+        pct_change = normalize(closes)
+        for ticker in pct_change.columns:
+            patched["data"].append(_trace(ticker, pct_change[ticker].dropna(), label_for(ticker)))
+            drawn.append(ticker)
+    return patched, drawn
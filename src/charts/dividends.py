@@ -0,0 +1,42 @@
+import plotly.graph_objs as go
+from utils.actions import dividend_analytics, dividend_summary
+from utils.figures import empty_fig
+from utils.instrumentation import stage
+
+ANNUAL_YEARS = 10
+
+def _layout(fig, yaxis_title):
+    fig.update_layout(
+        template="plotly_dark",
+        margin=dict(l=20, r=20, t=30, b=20),
+        yaxis_title=yaxis_title,
+        legend_title="Stocks",
+        showlegend=True,
+    )
+    return fig
+
+def yield_figure(analytics, label_for):
+    fig = go.Figure()
+    for ticker in analytics["yield"].columns:
+        series = analytics["yield"][ticker].dropna()
+        fig.add_trace(go.Scattergl(x=series.index, y=series.to_numpy(), mode="lines",
+                                   name=f"{label_for(ticker)} ({ticker})"))
+    return _layout(fig, "Trailing 12m yield %")
+
+def annual_figure(analytics, label_for):
+    annual = analytics["annual"].iloc[-ANNUAL_YEARS:]
+    fig = go.Figure()
+    for ticker in annual.columns:
+        fig.add_trace(go.Bar(x=annual.index, y=annual[ticker].to_numpy(), name=f"{label_for(ticker)} ({ticker})"))
+    fig.update_layout(barmode="group", xaxis=dict(type="category"))
+    return _layout(fig, "Dividends per share")
+
+def dividend_view(tickers, label_for):
+    # (yield figure, annual payouts figure, summary rows) for the main + Compare tickers
+    with stage("compute", chart="dividends"):
+        analytics = dividend_analytics(tickers)
+    if analytics is None:
+        message = "No data"
+        return empty_fig("Dividends", message), empty_fig("Dividends", message), []
+    with stage("figure", chart="dividends"):
+        return yield_figure(analytics, label_for), annual_figure(analytics, label_for), dividend_summary(analytics)
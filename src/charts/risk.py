@@ -0,0 +1,36 @@
+import numpy as np
+import plotly.graph_objs as go
+from utils.figures import empty_fig
+from utils.instrumentation import stage
+from utils.risk import risk_analytics, risk_summary
+
+# Beyond this many tickers the axes drop their labels (hover still names both)
+LABELLED_TICKERS = 50
+
+def correlation_figure(correlation):
+    # Daily-return correlations; float32 keeps a 500 x 500 matrix's payload small
+    tickers = list(correlation.columns)
+    labelled = len(tickers) <= LABELLED_TICKERS
+    fig = go.Figure(go.Heatmap(
+        z=correlation.to_numpy(dtype=np.float32),
+        x=tickers, y=tickers,
+        zmin=-1, zmax=1, colorscale="RdBu", reversescale=True,
+        colorbar=dict(title="Correlation"),
+        hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+    ))
+    fig.update_layout(
+        template="plotly_dark",
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis=dict(showticklabels=labelled),
+        yaxis=dict(showticklabels=labelled, autorange="reversed"),
+    )
+    return fig
+
+def risk_view(tickers):
+    # (correlation heatmap, ranked risk table rows) for the main + Compare tickers
+    with stage("compute", chart="risk"):
+        analytics = risk_analytics(tickers)
+    if analytics is None:
+        return empty_fig("Correlation", "No data"), []
+    with stage("figure", chart="risk"):
+        return correlation_figure(analytics["correlation"]), risk_summary(analytics)
@@ -0,0 +1,71 @@
+import math
+from dash import dash_table, dcc, html
+from utils.data import get_history, series_key
+from utils.table_query import cached_order
+
+# Bar intervals offered on the History tab (label, interval)
+HISTORY_INTERVALS = [("Daily", "1d"), ("Weekly", "1wk"), ("Hourly", "1h"), ("5 min", "5m"), ("1 min", "1m")]
+PAGE_SIZE = 25
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+COLUMNS = ["Date"] + PRICE_COLUMNS + ["Volume", "Dividends", "Stock Splits"]
+
+def _date_labels(interval):
+    fmt = "%Y-%m-%d" if interval in ("1d", "1wk") else "%Y-%m-%d %H:%M"
+    return lambda index: index.strftime(fmt)
+
+def history_layout():
+    # Paging, sorting and filtering all happen server-side, so the table only ever
+    # holds the rows of the current page
+    return html.Div([
+        html.Div([
+            html.Label("Bar interval:", className="section-label"),
+            dcc.RadioItems(
+                id="history-interval",
+                options=[{"label": label, "value": value} for label, value in HISTORY_INTERVALS],
+                value="1d",
+                inline=True,
+                className="checklist"
+            )
+        ], className="card"),
+        html.Div([
+            dash_table.DataTable(
+                id="history-table",
+                columns=[{"name": c, "id": c, "type": "datetime" if c == "Date" else "numeric"} for c in COLUMNS],
+                page_current=0,
+                page_size=PAGE_SIZE,
+                page_action="custom",
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
+                filter_action="custom",
+                filter_query="",
+                style_table={"overflowX": "auto"},
+                style_header={"backgroundColor": "#222", "color": "white", "fontWeight": "bold"},
+                style_filter={"backgroundColor": "#1a1a1a", "color": "white"},
+                style_cell={"backgroundColor": "#111", "color": "white", "border": "1px solid #333",
+                            "fontFamily": "inherit", "padding": "6px"},
+            )
+        ], className="card")
+    ])
+
+def history_page(ticker_symbol, interval, page_current, page_size, sort_by, filter_query):
+    # (rows of the requested page, page count, page index actually served)
+    data = get_history(ticker_symbol, interval=interval)
+    if data.empty:
+        return [], 1, 0
+    # Cached bars only carry Dividends / Stock Splits for tickers that have any
+    missing = [c for c in COLUMNS[1:] if c not in data.columns]
+    if missing:
+        data = data.assign(**dict.fromkeys(missing, 0.0))
+    labels = _date_labels(interval)
+    order = cached_order(series_key(ticker_symbol, interval), data, filter_query, sort_by, labels)
+    page_size = page_size or PAGE_SIZE
+    page_count = max(math.ceil(len(order) / page_size), 1)
+    page_current = min(page_current or 0, page_count - 1)
+    rows = data.iloc[order[page_current * page_size:(page_current + 1) * page_size]]
+    # Cached prices may be float32 (exact to the cent, see utils.bars); widen before
+    # rounding so the 2 decimals survive JSON
+    page = rows[COLUMNS[1:]].astype(dict.fromkeys(PRICE_COLUMNS, float))
+    page = page.round({c: 2 for c in PRICE_COLUMNS + ["Dividends"]})
+    page.insert(0, "Date", labels(rows.index))
+    return page.to_dict("records"), page_count, page_current
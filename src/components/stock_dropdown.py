@@ -1,5 +1,5 @@
 from dash import dcc, Input, Output
-from yahooquery import search
+from utils.search import search_symbols, symbol_label
 
 DEFAULT_STOCKS = [
     {"label": "Apple", "value": "AAPL"},
@@ -11,8 +11,6 @@ DEFAULT_STOCKS = [
     {"label": "Meta", "value": "META"},
 ]
 
-SEARCH_CACHE = {}
-
 class StockDropdown:
     def __init__(self, app, component_id=None, index=None):
         self.app = app
@@ -49,31 +47,26 @@ class StockDropdown:
             return self._generate_options(search_value, selected_value)
 
     def _generate_options(self, search_value, selected_value):
-        search_options = []
+        return build_options(search_value, selected_value)
+
+# Shared by the main dropdown and the Compare tab dropdowns
+def build_options(search_value, selected_value):
+    search_options = []
 
-        if search_value:
-            try:
-                results = search(search_value, first_quote=False, quotes_count=10).get("quotes", [])[:10]
-                for q in results:
-                    sym = q.get("symbol")
-                    if not sym:
-                        continue
-                    label = q.get("shortname") or q.get("shortName") or sym
-                    SEARCH_CACHE[sym] = label
-                    search_options.append({"label": f"{label} ({sym})", "value": sym})
-            except Exception:
-                pass
+    if search_value:
+        for sym, label in search_symbols(search_value):
+            search_options.append({"label": f"{label} ({sym})", "value": sym})
 
-        # Add default stocks if not already in search results
-        existing_values = [opt["value"] for opt in search_options]
-        default_options = [
-            {"label": f"{s['label']} ({s['value']})", "value": s["value"]}
-            for s in DEFAULT_STOCKS if s["value"] not in existing_values
-        ]
+    # Add default stocks if not already in search results
+    existing_values = [opt["value"] for opt in search_options]
+    default_options = [
+        {"label": f"{s['label']} ({s['value']})", "value": s["value"]}
+        for s in DEFAULT_STOCKS if s["value"] not in existing_values
+    ]
 
-        # Ensure selected value stays visible
-        if selected_value and selected_value not in [opt["value"] for opt in search_options + default_options]:
-            label = SEARCH_CACHE.get(selected_value, selected_value)
-            search_options.append({"label": f"{label} ({selected_value})", "value": selected_value})
+    # Ensure selected value stays visible
+    if selected_value and selected_value not in [opt["value"] for opt in search_options + default_options]:
+        label = symbol_label(selected_value, selected_value)
+        search_options.append({"label": f"{label} ({selected_value})", "value": selected_value})
 
-        return search_options + default_options
+    return search_options + default_options
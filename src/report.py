@@ -0,0 +1,227 @@
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Headless HTML reports for a watchlist, without the Dash UI:
+#
+#     python src/report.py AAPL MSFT NVDA --out reports
+#     python src/report.py --watchlist tickers.txt --workers 8
+#
+# One standalone page per ticker (candlestick chart, Compare chart against the
+# benchmark, key metrics and risk), built with the same chart and data code as the app.
+# Tickers are spread over a process pool; the workers share the bar store and the
+# STOCK_CACHE_BACKEND cache, so bars and quotes fetched by one (or by the app) are read,
+# not fetched, by the others, and they all draw on the host's one upstream budget. Each
+# page is written as soon as it is built and the index gains its row at the same time,
+# so a long batch can be browsed (or interrupted) midway.
+
+DEFAULT_OPTIONS = ["MA50", "MA200"]
+# fetch_metrics() key -> label, in the Overview tab's order
+METRIC_LABELS = [
+    ("pe", "PE Ratio"), ("beta", "Beta"), ("week52_low", "52-Week Low"), ("week52_high", "52-Week High"),
+    ("volume", "Volume"), ("open", "Open"), ("last_close", "Last Close"),
+    ("dividend_date", "Dividend Date"), ("earnings_date", "Earnings Date"), ("analyst", "Analyst"),
+]
+# Risk table columns shown in the index, from utils.risk.RISK_COLUMNS
+INDEX_RISK = ["Annual return %", "Volatility %", "Max drawdown %", "Sharpe", "Beta"]
+# Written once next to the pages instead of inlined (~3.5 MB) into every one of them
+PLOTLY_JS = "plotly.min.js"
+CHART_HEIGHT, COMPARE_HEIGHT = "640px", "420px"
+
+STYLE = """<style>
+body { background-color: #111111; color: white; font-family: "Arial", sans-serif; margin: 0; padding: 15px; }
+h1 { font-size: 1.6rem; }
+table { border-collapse: collapse; margin-bottom: 15px; }
+th, td { border: 1px solid #333333; padding: 4px 10px; text-align: left; }
+th { background-color: #1a1a1a; }
+a { color: #8ab4f8; }
+.stale-note { color: #f3e79b; font-size: 0.85rem; }
+.error { color: #ff6b6b; }
+</style>"""
+
+def _page_head(title):
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<script src=\"{PLOTLY_JS}\"></script>{STYLE}</head><body>\n")
+
+def _table(header, rows):
+    cells = "".join(f"<th>{html.escape(str(h))}</th>" for h in header)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(_cell(v))}</td>" for v in row) + "</tr>\n" for row in rows)
+    return f"<table><tr>{cells}</tr>\n{body}</table>\n"
+
+def _cell(value):
+    return "N/A" if value is None else str(value)
+
+def _report_file(ticker):
+    return ticker.upper().replace("/", "_") + ".html"
+
+# ------------------ Worker side ------------------
+def _label(ticker):
+    from components.stock_dropdown import DEFAULT_STOCKS
+    from utils.search import symbol_label
+    labels = {s["value"]: s["label"] for s in DEFAULT_STOCKS}
+    return labels.get(ticker) or symbol_label(ticker, ticker)
+
+def _risk_row(ticker, benchmark):
+    from utils.instrumentation import record_error
+    from utils.risk import risk_analytics, risk_summary
+    try:
+        analytics = risk_analytics([ticker], benchmark=benchmark)
+        return risk_summary(analytics)[0] if analytics is not None else {}
+    except Exception:
+        record_error("report_risk")
+        return {}
+
+def build_report(ticker, out_dir, options, benchmark):
+    # Writes <out_dir>/<TICKER>.html; returns the index row for it
+    from charts.candlestick import create_candlestick
+    from charts.compare import compare_figure
+    from utils.data import fetch_metrics
+    from utils.gateway import stale_message, stale_notes
+
+    start = time.perf_counter()
+    label = _label(ticker)
+    label_with_ticker = f"{label} ({ticker})"
+    with stale_notes() as stale:
+        metrics = fetch_metrics(ticker)
+        risk = _risk_row(ticker, benchmark)
+        candles = create_candlestick(ticker, label_with_ticker, None, options)
+        compare, _ = compare_figure(list(dict.fromkeys([ticker, benchmark])),
+                                    lambda t: label if t == ticker else _label(t))
+    compare.update_layout(title=f"{label_with_ticker} vs {benchmark}")
+
+    path = os.path.join(out_dir, _report_file(ticker))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(_page_head(label_with_ticker))
+        f.write(f"<h1>{html.escape(label_with_ticker)}</h1>\n<p><a href=\"index.html\">Watchlist</a> · "
+                f"generated {time.strftime('%Y-%m-%d %H:%M')}</p>\n")
+        if stale:
+            f.write(f"<p class=\"stale-note\">{html.escape(stale_message(stale))}</p>\n")
+        f.write("<h3>Key Metrics</h3>\n")
+        f.write(_table([name for _, name in METRIC_LABELS], [[metrics.get(k) for k, _ in METRIC_LABELS]]))
+        if risk:
+            f.write(f"<h3>Risk &amp; Return (beta vs {html.escape(benchmark)})</h3>\n")
+            columns = [c for c in risk if c != "Rank"]
+            f.write(_table(columns, [[risk[c] for c in columns]]))
+        # One figure's HTML in memory at a time
+        for fig, height in ((candles, CHART_HEIGHT), (compare, COMPARE_HEIGHT)):
+            f.write(fig.to_html(full_html=False, include_plotlyjs=False, default_height=height))
+            f.write("\n")
+        f.write("</body></html>\n")
+    os.replace(tmp, path)
+    return {
+        "ticker": ticker,
+        "label": label,
+        "file": os.path.basename(path),
+        "seconds": time.perf_counter() - start,
+        "stale": bool(stale),
+        "metrics": {k: metrics.get(k) for k in ("last_close", "pe", "analyst")},
+        "risk": {c: risk.get(c) for c in INDEX_RISK},
+    }
+
+# ------------------ Batch ------------------
+def _tickers(text):
+    # Comma- or whitespace-separated symbols; "#" starts a comment
+    lines = (line.split("#", 1)[0] for line in text.splitlines())
+    return [t.strip().upper() for line in lines for t in line.replace(",", " ").split()]
+
+def _write_plotly_js(out_dir):
+    from plotly.offline import get_plotlyjs
+    with open(os.path.join(out_dir, PLOTLY_JS), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+
+class Index:
+    # index.html, streamed: a row per report as it completes, the run summary at the end
+    HEADER = ["Ticker", "Name", "Last Close", "PE Ratio", "Analyst"] + INDEX_RISK + ["Seconds"]
+
+    def __init__(self, out_dir, total):
+        self._f = open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8")
+        self._f.write(_page_head("Watchlist report"))
+        self._f.write(f"<h1>Watchlist report</h1>\n<p>{total} tickers, started "
+                      f"{time.strftime('%Y-%m-%d %H:%M')}</p>\n<table><tr>")
+        self._f.write("".join(f"<th>{h}</th>" for h in self.HEADER) + "</tr>\n")
+        self._f.flush()
+
+    def add(self, row):
+        metrics, risk = row["metrics"], row["risk"]
+        values = [row["label"], metrics["last_close"], metrics["pe"], metrics["analyst"]]
+        values += [risk[c] for c in INDEX_RISK] + [f"{row['seconds']:.2f}"]
+        link = f"<a href=\"{html.escape(row['file'])}\">{html.escape(row['ticker'])}</a>"
+        if row["stale"]:
+            link += " <span class=\"stale-note\">(delayed)</span>"
+        self._f.write(f"<tr><td>{link}</td>" + "".join(f"<td>{html.escape(_cell(v))}</td>" for v in values) + "</tr>\n")
+        self._f.flush()
+
+    def failed(self, ticker, error):
+        self._f.write(f"<tr><td>{html.escape(ticker)}</td><td class=\"error\" colspan=\"{len(self.HEADER) - 1}\">"
+                      f"{html.escape(error)}</td></tr>\n")
+        self._f.flush()
+
+    def close(self, summary):
+        self._f.write(f"</table>\n<p>{html.escape(summary)}</p>\n</body></html>\n")
+        self._f.close()
+
+def run(tickers, out_dir, workers, options, benchmark, log=sys.stderr):
+    # Returns (reports written, failures, wall seconds)
+    os.makedirs(out_dir, exist_ok=True)
+    _write_plotly_js(out_dir)
+    index = Index(out_dir, len(tickers))
+    written, failures = 0, 0
+    busy = 0.0
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(build_report, t, out_dir, options, benchmark): t for t in tickers}
+        for done, future in enumerate(as_completed(futures), start=1):
+            ticker = futures[future]
+            try:
+                row = future.result()
+            except Exception as exc:
+                failures += 1
+                index.failed(ticker, f"{type(exc).__name__}: {exc}")
+                print(f"[{done}/{len(tickers)}] {ticker} failed: {exc}", file=log, flush=True)
+                continue
+            written += 1
+            busy += row["seconds"]
+            index.add(row)
+            print(f"[{done}/{len(tickers)}] {ticker} {row['seconds']:.2f}s", file=log, flush=True)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown()
+        wall = time.perf_counter() - start
+        summary = (f"{written} reports, {failures} failed, in {wall:.1f}s with {workers} workers: "
+                   f"{written / wall if wall else 0:.2f} reports/s, {busy / max(written, 1):.2f}s per report")
+        index.close(summary)
+        print(summary, file=log, flush=True)
+    return written, failures, wall
+
+def main():
+    parser = argparse.ArgumentParser(description="Render standalone HTML reports for a watchlist.")
+    parser.add_argument("tickers", nargs="*", help="symbols (default: --watchlist, else STOCK_WATCHLIST)")
+    parser.add_argument("--watchlist", help="file of symbols, comma- or whitespace-separated")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--options", nargs="*", default=DEFAULT_OPTIONS,
+                        help="candlestick overlays, as in the Charts tab (default: MA50 MA200)")
+    parser.add_argument("--benchmark", default=os.environ.get("STOCK_BENCHMARK", "SPY"))
+    args = parser.parse_args()
+
+    tickers = [t.upper() for t in args.tickers]
+    if args.watchlist:
+        with open(args.watchlist, encoding="utf-8") as f:
+            tickers += _tickers(f.read())
+    if not tickers:
+        tickers = _tickers(os.environ.get("STOCK_WATCHLIST", ""))
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        parser.error("no tickers: pass symbols, --watchlist or set STOCK_WATCHLIST")
+    _, failures, _ = run(tickers, args.out, max(1, args.workers), args.options, args.benchmark.upper())
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
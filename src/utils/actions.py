@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from .cache import TTLCache
+from .data import get_histories, get_history
+from .indicators import data_version
+from .providers import get_provider
+
+# Corporate actions (dividends, splits) pulled out of the stored daily bars, so the
+# Dividends tab never needs an upstream call of its own.
+ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+# Ticker -> (bars version, event rows); rebuilt only when the bars change
+ACTIONS_CACHE = TTLCache(maxsize=512, ttl=24 * 60 * 60, name="actions")
+# Calendar year-end resample alias: "YE" since pandas 2.2 (which deprecates "A"), "A" before
+try:
+    pd.tseries.frequencies.to_offset("YE")
+    YEAR_END = "YE"
+except ValueError:
+    YEAR_END = "A"
+
+def extract_actions(bars):
+    # Rows with a dividend or a split, indexed by calendar date
+    cols = [c for c in ACTION_COLUMNS if c in bars.columns]
+    actions = bars[cols].fillna(0.0).reindex(columns=ACTION_COLUMNS, fill_value=0.0)
+    actions = actions[(actions != 0).any(axis=1)]
+    index = actions.index.tz_localize(None) if actions.index.tz is not None else actions.index
+    return actions.set_axis(index.normalize())
+
+def get_actions(ticker_symbol):
+    bars = get_history(ticker_symbol)
+    key = ticker_symbol.upper()
+    version = data_version(bars)
+    cached = ACTIONS_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, extract_actions(bars))
+        ACTIONS_CACHE.set(key, cached)
+    return cached[1]
+
+def _wide(tickers, column, index, fill):
+    frames = {t: get_actions(t)[column] for t in tickers}
+    wide = pd.concat(frames, axis=1) if frames else pd.DataFrame(columns=tickers)
+    wide = wide.groupby(level=0).sum().reindex(index, fill_value=0.0)
+    return wide.reindex(columns=tickers).fillna(0.0).replace(0.0, fill)
+
+def split_factors(splits):
+    # Shares one share has become through splits *after* each date (1 if none since)
+    after = splits.iloc[::-1].cumprod().iloc[::-1]
+    return after.shift(-1).fillna(1.0)
+
+def dividend_analytics(tickers, adjusted=None):
+    # Every ticker at once on one date-aligned frame (dates x tickers). `adjusted` says
+    # whether upstream already restates dividends for later splits (Yahoo does); when
+    # it doesn't they are divided by the split factor here.
+    closes = get_histories(tickers)
+    if closes.empty:
+        return None
+    tickers = list(closes.columns)
+    dividends = _wide(tickers, "Dividends", closes.index, 0.0)
+    splits = _wide(tickers, "Stock Splits", closes.index, 1.0)
+    if adjusted is None:
+        adjusted = getattr(get_provider(), "adjusted_dividends", False)
+    if not adjusted:
+        dividends = dividends / split_factors(splits)
+
+    ttm = dividends.rolling("365D").sum()
+    yield_pct = (ttm / closes.ffill() * 100).where(closes.ffill().notna())
+    annual = dividends.resample(YEAR_END).sum()
+    annual.index = annual.index.year
+    # Growth only over complete calendar years
+    complete = annual[annual.index < pd.Timestamp.today().year]
+    growth = complete.pct_change(fill_method=None) * 100
+    cagr5 = ((complete.iloc[-1] / complete.iloc[-6]) ** (1 / 5) - 1) * 100 if len(complete) >= 6 else None
+    return {
+        "closes": closes, "dividends": dividends, "splits": splits,
+        "ttm": ttm, "yield": yield_pct, "annual": annual,
+        "growth": growth.replace([np.inf, -np.inf], np.nan),
+        "cagr5": cagr5.replace([np.inf, -np.inf], np.nan) if cagr5 is not None else None,
+    }
+
+SUMMARY_COLUMNS = ["Ticker", "Last dividend", "Paid on", "Payments (12m)", "TTM dividend",
+                   "Trailing yield %", "Growth (last year) %", "5y CAGR %", "Last split"]
+
+def dividend_summary(analytics):
+    # One row per ticker (SUMMARY_COLUMNS) for the tab's table
+    dividends, splits = analytics["dividends"], analytics["splits"]
+    paid = dividends.where(dividends > 0)
+    last_split = splits.where(splits != 1.0)
+    recent = dividends.index >= dividends.index[-1] - pd.Timedelta(days=365)
+    growth = analytics["growth"]
+    cagr5 = analytics["cagr5"]
+    rows = []
+    for t in dividends.columns:
+        last_paid = paid[t].last_valid_index()
+        split_at = last_split[t].last_valid_index()
+        rows.append({
+            "Ticker": t,
+            "Last dividend": None if last_paid is None else round(float(paid[t][last_paid]), 4),
+            "Paid on": None if last_paid is None else str(last_paid.date()),
+            "Payments (12m)": int((dividends[t][recent] > 0).sum()),
+            "TTM dividend": round(float(analytics["ttm"][t].iloc[-1]), 4),
+            "Trailing yield %": _round(analytics["yield"][t].ffill().iloc[-1]),
+            "Growth (last year) %": _round(growth[t].iloc[-1]) if len(growth) else None,
+            "5y CAGR %": _round(cagr5[t]) if cagr5 is not None else None,
+            "Last split": None if split_at is None else f"{last_split[t][split_at]:g}:1 on {split_at.date()}",
+        })
+    return rows
+
+def _round(value, digits=2):
+    return None if pd.isna(value) else round(float(value), digits)
@@ -0,0 +1,139 @@
+import contextvars
+import functools
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .store import STORE_DIR
+
+# Slow callbacks run as Dash background callbacks when the optional `dash[diskcache]`
+# extras are installed, so request threads stay free and re-triggering a callback (a new
+# ticker picked) cancels its stale job. STOCK_BACKGROUND=off, or missing extras, runs
+# them inline as ordinary callbacks.
+POLL_MS = 300
+# Jobs run on this many threads of the worker that received them
+JOB_WORKERS = int(os.environ.get("STOCK_BACKGROUND_WORKERS", "8"))
+JOB_EXPIRE = 10 * 60
+# Set while a job runs: its return value gets pickled into the job cache
+_in_job = contextvars.ContextVar("in_background_job", default=False)
+# (manager, job id) of the job running on this thread
+_current_job = contextvars.ContextVar("background_job", default=None)
+
+def in_background_job():
+    return _in_job.get()
+
+class JobCancelled(Exception):
+    pass
+
+class PreEncoded(str):
+    # JSON text a job returns for an output: stored as is, and sent as is when polled
+    __slots__ = ()
+
+def _fragment(value):
+    # Only made when orjson is in use (see utils.figure_cache)
+    if not isinstance(value, PreEncoded):
+        return value
+    from orjson import Fragment
+    return Fragment(str(value))
+
+def _fragments(result):
+    if isinstance(result, (list, tuple)):
+        return [_fragment(r) for r in result]
+    return _fragment(result)
+
+def _job_manager_class():
+    from dash import DiskcacheManager
+
+    class ThreadJobManager(DiskcacheManager):
+        # Dash's DiskcacheManager forks a process per job, so everything a job caches or
+        # counts (bars, indicators, /metrics, hot tickers) would die with it. Here jobs
+        # run on a thread pool in the worker instead; results, progress and job state
+        # still go through diskcache, so any worker can answer the polls. A thread can't
+        # be killed: a cancelled job stops at its next set_progress() (or never starts),
+        # and whatever it returns after being cancelled is dropped.
+        def __init__(self, cache, workers=JOB_WORKERS, expire=None):
+            super().__init__(cache, expire=expire)
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="background-job")
+
+        def call_job_fn(self, key, job_fn, args, context):
+            job = uuid.uuid4().hex
+            self.handle.set(f"job-{job}", os.getpid(), expire=JOB_EXPIRE)
+            self._pool.submit(self._run, job, key, job_fn, args, context)
+            return job
+
+        def _run(self, job, key, job_fn, args, context):
+            token = _current_job.set((self, job))
+            try:
+                if not self.cancelled(job):
+                    job_fn(key, self._make_progress_key(key), args, context)
+                if self.cancelled(job):
+                    for stale in (key, self._make_progress_key(key), self._make_set_props_key(key)):
+                        self.clear_cache_entry(stale)
+            finally:
+                _current_job.reset(token)
+                self.handle.delete(f"job-{job}")
+                self.handle.delete(f"job-{job}-cancel")
+
+        def cancelled(self, job):
+            return self.handle.get(f"job-{job}-cancel") is not None
+
+        def terminate_job(self, job):
+            if job and self.job_running(job):
+                self.handle.set(f"job-{job}-cancel", True, expire=JOB_EXPIRE)
+
+        def get_result(self, key, job):
+            result = super().get_result(key, job)
+            return result if result is self.UNDEFINED else _fragments(result)
+
+        def terminate_unhealthy_job(self, job):
+            return False
+
+        def job_running(self, job):
+            return bool(job) and self.handle.get(f"job-{job}") is not None
+
+    return ThreadJobManager
+
+def background_manager():
+    if os.environ.get("STOCK_BACKGROUND", "on").lower() in ("0", "off", "false"):
+        return None
+    try:
+        import diskcache
+        cache = diskcache.Cache(os.environ.get("STOCK_CALLBACK_CACHE", os.path.join(STORE_DIR, "callbacks")))
+        return _job_manager_class()(cache, expire=JOB_EXPIRE)
+    except ImportError:
+        return None
+
+def _checked(set_progress):
+    # set_progress() that first stops a cancelled job
+    def checked(*value):
+        job = _current_job.get()
+        if job is not None and job[0].cancelled(job[1]):
+            raise JobCancelled()
+        return set_progress(*value)
+    return checked
+
+def background_callback(app, manager, *dependencies, progress=None, running=None, cancel=None, **kwargs):
+    # app.callback for a slow callback. With `progress` the function takes set_progress
+    # first; inline it gets a no-op so the same function works either way.
+    def decorator(fn):
+        if manager is not None:
+            inner = fn
+
+            @functools.wraps(inner)
+            def fn(*args):
+                if progress is not None:
+                    args = (_checked(args[0]),) + args[1:]
+                token = _in_job.set(True)
+                try:
+                    return inner(*args)
+                finally:
+                    _in_job.reset(token)
+            return app.callback(*dependencies, background=True, manager=manager, interval=POLL_MS,
+                                progress=progress, running=running, cancel=cancel, **kwargs)(fn)
+        if progress is not None:
+            inner = fn
+
+            @functools.wraps(inner)
+            def fn(*args):
+                return inner(lambda *_: None, *args)
+        return app.callback(*dependencies, running=running, **kwargs)(fn)
+    return decorator
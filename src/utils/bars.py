@@ -0,0 +1,93 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.api.internals import create_dataframe_from_blocks
+except ImportError:  # pandas < 3: frames are assembled from column views instead
+    create_dataframe_from_blocks = None
+
+# Compact in-memory form of a bar frame for the history caches. Prices are one
+# contiguous float32 block (columns x rows; float64 for prices from
+# FLOAT32_PRICE_LIMIT up), timestamps int64 epoch values, and any
+# other column (Dividends, Stock Splits, ...) is kept only at its non-zero rows, and
+# dropped altogether when it has none. The DatetimeIndex is kept as is: it already
+# stores int64 epoch values, and reusing the one object keeps pandas' lookup engine
+# warm across frame() calls.
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+# Below this float32 is off by under half a cent, so prices still round to the right
+# cent; tickers that trade higher (BRK-A) keep float64 prices
+FLOAT32_PRICE_LIMIT = 2 ** 17
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+class Bars:
+    __slots__ = ("index", "columns", "placement", "price_columns", "prices", "volume", "events", "_frame")
+
+    @classmethod
+    def from_frame(cls, frame):
+        self = cls()
+        self.index = frame.index
+        self.price_columns = [c for c in frame.columns if c in PRICE_COLUMNS]
+        prices = frame[self.price_columns].to_numpy(dtype=np.float64)
+        compact = np.nanmax(np.abs(prices), initial=0) < FLOAT32_PRICE_LIMIT
+        self.prices = _readonly(np.ascontiguousarray(prices.T, dtype=np.float32 if compact else np.float64))
+        self.volume = _readonly(frame["Volume"].to_numpy(copy=True)) if "Volume" in frame.columns else None
+        self.events = {}
+        for col in frame.columns:
+            if col in PRICE_COLUMNS or col == "Volume":
+                continue
+            values = frame[col].to_numpy()
+            positions = np.flatnonzero(values != 0)
+            if len(positions):
+                self.events[col] = (_readonly(positions), _readonly(values[positions].copy()))
+        self.columns = pd.Index([c for c in frame.columns
+                                 if c in PRICE_COLUMNS or c == "Volume" or c in self.events])
+        self.placement = {col: i for i, col in enumerate(self.columns)}
+        self._frame = None
+        return self
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def timestamps(self):
+        # Epoch values (UTC for tz-aware bars) in the index's unit, without a copy
+        return self.index.asi8
+
+    @property
+    def nbytes(self):
+        arrays = [self.timestamps, self.prices]
+        if self.volume is not None:
+            arrays.append(self.volume)
+        for positions, values in self.events.values():
+            arrays += [positions, values]
+        return sum(a.nbytes for a in arrays)
+
+    def frame(self):
+        # The stored arrays become the frame's blocks as they are (the price block is
+        # already laid out columns x rows, like pandas' own), so only the non-zero-only
+        # columns are allocated. Like any cached frame it is read-only. While a caller
+        # still holds the last frame it is handed out again, with its lookups warm.
+        frame = self._frame() if self._frame is not None else None
+        if frame is not None:
+            return frame
+        def at(*columns):
+            return np.array([self.placement[c] for c in columns], dtype=np.intp)
+
+        blocks = [(self.prices, at(*self.price_columns))]
+        if self.volume is not None:
+            blocks.append((self.volume[None, :], at("Volume")))
+        for col, (positions, values) in self.events.items():
+            dense = np.zeros((1, len(self.index)), dtype=values.dtype)
+            dense[0, positions] = values
+            blocks.append((dense, at(col)))
+        if create_dataframe_from_blocks is not None:
+            frame = create_dataframe_from_blocks(blocks, index=self.index, columns=self.columns)
+        else:
+            views = {self.columns[i]: values[j] for values, placement in blocks for j, i in enumerate(placement)}
+            frame = pd.DataFrame({col: views[col] for col in self.columns}, index=self.index, copy=False)
+        self._frame = weakref.ref(frame)
+        return frame
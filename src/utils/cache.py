@@ -0,0 +1,204 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+from .cache_backend import get_backend
+from .forksafe import Lock, after_fork
+from .instrumentation import CACHE_BYTES, CACHE_REQUESTS
+
+_MISSING = object()
+_caches = weakref.WeakSet()
+
+@after_fork
+def _forget_inflight():
+    # Fetches in flight on the parent's other threads never finish in a forked child
+    for cache in list(_caches):
+        cache._inflight = {}
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    # Bounded LRU whose entries expire after `ttl` seconds. get_or_fetch() coalesces
+    # concurrent misses for one key so only a single fetch is in flight at a time.
+    # With `shared` (a namespace) entries are also kept in the process-shared backend:
+    # local misses read it first, and a backend lock lets one worker fetch for all.
+    # Local copies of shared entries live `local_ttl` so refreshes elsewhere show up.
+    # `name` labels the hit/miss counters on /metrics. With `maxbytes`, least recently
+    # used entries are also evicted once the local entries' `sizeof(value)` sum exceeds it.
+    def __init__(self, maxsize=256, ttl=300, shared=None, local_ttl=30, name=None, maxbytes=None, sizeof=None):
+        self.name = name or shared or "unnamed"
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.ttl = ttl
+        self.shared = shared
+        self.local_ttl = min(ttl, local_ttl) if shared else ttl
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = Lock()
+        _caches.add(self)
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value, _ = entry
+        if expires < time.monotonic():
+            self._discard(key)
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _discard(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+        return entry
+
+    def _over_budget(self):
+        # The newest entry always stays, even when it alone is over maxbytes
+        if len(self._data) > self.maxsize:
+            return True
+        return self.maxbytes is not None and self.nbytes > self.maxbytes and len(self._data) > 1
+
+    def _set_local(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            self._discard(key)
+            self._data[key] = (time.monotonic() + self.local_ttl, value, size)
+            self.nbytes += size
+            while self._over_budget():
+                self._discard(next(iter(self._data)))
+        self._report()
+
+    def _report(self):
+        if self.sizeof:
+            CACHE_BYTES.set(self.nbytes, cache=self.name)
+
+    def _shared_key(self, key):
+        return f"{self.shared}:{key!r}"
+
+    def _shared_get(self, key):
+        if not self.shared:
+            return _MISSING
+        try:
+            return get_backend().get(self._shared_key(key), _MISSING)
+        except Exception:
+            return _MISSING
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+        if value is _MISSING:
+            value = self._shared_get(key)
+            if value is not _MISSING:
+                self._set_local(key, value)
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if value is _MISSING else "hit")
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self.shared:
+            try:
+                get_backend().set(self._shared_key(key), value, self.ttl)
+            except Exception:
+                pass
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._discard(key)
+        self._report()
+        if self.shared:
+            try:
+                get_backend().delete(self._shared_key(key))
+            except Exception:
+                pass
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+        self._report()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _fetch(self, key, fetch):
+        value = self._shared_get(key)
+        if value is not _MISSING:
+            self._set_local(key, value)
+            return value
+        if not self.shared:
+            value = fetch()
+            self.set(key, value)
+            return value
+        try:
+            lock = get_backend().lock(self._shared_key(key))
+        except Exception:
+            lock = nullcontext()
+        with lock:
+            # Another worker may have filled it while we waited for the lock
+            value = self._shared_get(key)
+            if value is _MISSING:
+                value = fetch()
+                self.set(key, value)
+            else:
+                self._set_local(key, value)
+        return value
+
+    def refresh(self, key, fetch, fresh=None):
+        # Replace the entry with fetch(), unless `fresh(value)` accepts the current (shared)
+        # one: another worker refreshed it already. One worker fetches under the backend
+        # lock while the others wait, then read its result.
+        try:
+            lock = get_backend().lock(self._shared_key(key)) if self.shared else nullcontext()
+        except Exception:
+            lock = nullcontext()
+        with lock:
+            if fresh is not None:
+                value = self._shared_get(key)
+                if value is _MISSING:
+                    with self._lock:
+                        value = self._lookup(key)
+                if value is not _MISSING and fresh(value):
+                    self._set_local(key, value)
+                    return value
+            value = fetch()
+            self.set(key, value)
+            return value
+
+    def get_or_fetch(self, key, fetch):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if leader else "coalesced")
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._fetch(key, fetch)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
@@ -0,0 +1,198 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from .forksafe import Lock, after_fork
+from .store import STORE_DIR
+
+# Process-shared key/value store behind the shared caches (metrics, search) and the
+# per-ticker fetch leases, so N workers on a host cost one upstream fetch instead of N.
+# STOCK_CACHE_BACKEND=sqlite (default, a file in the bar store directory) | redis | memory.
+
+class CacheBackend:
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl):
+        # Set only if absent (or expired); True when this call stored the value
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_if(self, key, value):
+        # Delete only while `key` still holds `value`
+        raise NotImplementedError
+
+    def _try_add(self, key, value, ttl):
+        try:
+            return self.add(key, value, ttl)
+        except Exception:
+            return None
+
+    @contextmanager
+    def lock(self, name, ttl=60, timeout=30):
+        # Best-effort cross-process mutex; expires after `ttl` in case its holder dies,
+        # and waiters give up after `timeout` (or on backend errors) and proceed without it.
+        # A holder that outlives `ttl` must not release the next holder's lock, so each
+        # acquisition stores its own token and only deletes the key while it still holds it.
+        key = f"lock:{name}"
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + timeout
+        acquired = self._try_add(key, token, ttl)
+        while acquired is False and time.monotonic() < deadline:
+            time.sleep(0.05)
+            acquired = self._try_add(key, token, ttl)
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                try:
+                    self.delete_if(key, token)
+                except Exception:
+                    pass
+
+class MemoryBackend(CacheBackend):
+    # Process-local stand-in (single worker, tests)
+    def __init__(self):
+        self._data = {}
+        self._lock = Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] < time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_if(self, key, value):
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None and entry[0] == value:
+                del self._data[key]
+
+class SQLiteBackend(CacheBackend):
+    # One SQLite file (WAL mode) shared by every worker process on the host
+    PRUNE_EVERY = 200
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        # SQLite connections must not cross a fork
+        after_fork(self._forget_connections)
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                     (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + ttl))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def add(self, key, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM cache WHERE key = ? AND expires < ?", (key, now))
+        cur = conn.execute("INSERT OR IGNORE INTO cache VALUES (?, ?, ?)",
+                           (key, pickle.dumps(value), now + ttl))
+        return cur.rowcount == 1
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_if(self, key, value):
+        # add() pickles with the default protocol, so an equal value has the same bytes
+        self._conn().execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, pickle.dumps(value)))
+
+class RedisBackend(CacheBackend):
+    # Any Redis-protocol server; needs the optional `redis` package
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        raw = self.client.get(key)
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=max(int(ttl), 1))
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(key, pickle.dumps(value), ex=max(int(ttl), 1), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    # Compare-and-delete in one step on the server
+    DELETE_IF = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def delete_if(self, key, value):
+        self.client.eval(self.DELETE_IF, 1, key, pickle.dumps(value))
+
+_backend = None
+_backend_lock = Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("STOCK_CACHE_BACKEND", "sqlite")
+                if name == "redis":
+                    _backend = RedisBackend(os.environ.get("STOCK_CACHE_URL", "redis://localhost:6379/0"))
+                elif name == "memory":
+                    _backend = MemoryBackend()
+                else:
+                    path = os.environ.get("STOCK_CACHE_PATH", os.path.join(STORE_DIR, "shared.sqlite"))
+                    _backend = SQLiteBackend(path)
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
@@ -1,28 +1,320 @@
-import yfinance as yf
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import numpy as np
 import pandas as pd
+from .bars import Bars
 from .formatting import format_number, format_date
+from .cache import TTLCache
+from .cache_backend import get_backend
+from .forksafe import Lock
+from .downsample import choose_interval, pixel_budget, visible_range
+from .indicators import data_version, resume_point
+from .gateway import fetch_or_stale, note_stale, revalidate, upstream_call
+from .resample import INTERVALS, INTRADAY, resample_tail
+from .store import read_bars, read_meta, write_bars, append_bars
 
-def get_history(ticker_symbol, start="2020-01-01"):
-    ticker = yf.Ticker(ticker_symbol)
-    return ticker.history(start=start, end=pd.Timestamp.today())
+HISTORY_START = "2020-01-01"
+# How long stored bars are trusted before asking upstream for the missing tail
+REFRESH_SECONDS = 15 * 60
+INTRADAY_REFRESH_SECONDS = 60
+# Upstream only serves minute bars for about the last week
+INTRADAY_DAYS = 7
+
+def _download(ticker_symbol, start, interval="1d"):
+    # Includes today's (possibly partial) bar; the last stored bar is always refetched
+    return upstream_call("history", ticker_symbol, start,
+                         end=pd.Timestamp.today().normalize() + pd.Timedelta(days=1), interval=interval)
+
+def _fetch_start(start, interval):
+    if interval not in INTRADAY:
+        return start
+    floor = pd.Timestamp.today().normalize() - pd.Timedelta(days=INTRADAY_DAYS)
+    return str(max(pd.Timestamp(start), floor).date())
+
+# How often each ticker is asked for by the UI; the scheduler keeps the top of this warm.
+# Past COUNTS_MAX tickers every count is halved and the ones that reach zero are dropped,
+# so a long-running worker (or a scan of thousands of symbols) keeps a bounded, recent tally.
+REQUEST_COUNTS = Counter()
+COUNTS_MAX = 2000
+_counts_lock = Lock()
+
+def _count_request(ticker_symbol):
+    with _counts_lock:
+        REQUEST_COUNTS[ticker_symbol.upper()] += 1
+        if len(REQUEST_COUNTS) > COUNTS_MAX:
+            for ticker, count in list(REQUEST_COUNTS.items()):
+                if count // 2:
+                    REQUEST_COUNTS[ticker] = count // 2
+                else:
+                    del REQUEST_COUNTS[ticker]
+
+def hot_tickers(n=20):
+    with _counts_lock:
+        return [t for t, _ in REQUEST_COUNTS.most_common(n)]
+
+# Per-process memo of stored bars, keyed by (ticker, interval), so repeated callbacks
+# (zoom/pan) skip the disk read. Entries live no longer than the refresh interval, after
+# which the store is rechecked. Bars are held compactly and evicted by size, so a
+# worker's memory stays within STOCK_HISTORY_CACHE_MB however many tickers it serves.
+HISTORY_CACHE_BYTES = int(float(os.environ.get("STOCK_HISTORY_CACHE_MB", "64")) * 2 ** 20)
+
+def _entry_bytes(entry):
+    return entry[1].nbytes
+
+HISTORY_CACHE = TTLCache(maxsize=65536, ttl=REFRESH_SECONDS, name="history",
+                         maxbytes=HISTORY_CACHE_BYTES, sizeof=_entry_bytes)
+# (ticker, interval) -> (source version, bars) for the locally resampled intervals, which
+# are a fraction of their source's size
+RESAMPLED_CACHE = TTLCache(maxsize=65536, ttl=24 * 60 * 60, name="resampled",
+                           maxbytes=HISTORY_CACHE_BYTES // 4, sizeof=_entry_bytes)
+
+def _slice_from(bars, start):
+    start = pd.Timestamp(start)
+    if bars.index.tz is not None and start.tz is None:
+        start = start.tz_localize(bars.index.tz)
+    return bars.iloc[bars.index.searchsorted(start):]
+
+def _load_history(ticker_symbol, start, force=False, interval="1d", fetch_due=False, fetch=True, since=None):
+    # (covered, bars, due): the tail is refetched with `force`, or with `fetch_due` when it
+    # is due; `due` is when it was last checked if it is due but wasn't refetched, else None.
+    # With `since`, `force` only applies if upstream wasn't checked at or after that time.
+    # With fetch=False nothing is downloaded, and None means a download is needed.
+    stored = read_bars(ticker_symbol, interval)
+    meta = read_meta(ticker_symbol, interval)
+    covered = meta.get("start")
+
+    # Nothing usable on disk (or not far enough back): full download
+    if stored is None or stored.empty or not covered or pd.Timestamp(covered) > pd.Timestamp(start):
+        if not fetch:
+            return None
+        fresh = _download(ticker_symbol, start, interval)
+        if fresh.empty:
+            return start, fresh, None
+        return start, write_bars(ticker_symbol, fresh, interval, start=start), None
+
+    # Only the tail since the last stored bar is refetched; that bar is replaced in case it was partial
+    refresh = INTRADAY_REFRESH_SECONDS if interval in INTRADAY else REFRESH_SECONDS
+    checked = meta.get("checked", 0)
+    due = time.time() - checked > refresh
+    if since is not None and checked >= since:
+        force = False
+    if not (force or (due and fetch_due)):
+        return covered, stored, checked if due else None
+    if not fetch:
+        return None
+    last = stored.index[-1].replace(tzinfo=None).normalize()
+    last = _fetch_start(last, interval)
+    return covered, append_bars(ticker_symbol, _download(ticker_symbol, last, interval), interval, start=covered), None
+
+def _load_history_shared(ticker_symbol, start, force=False, interval="1d", fetch_due=False, since=None):
+    # Bars already live in the shared on-disk store, whose partitions are replaced
+    # atomically, so reads take no lock. A download does: one worker fetches a ticker's
+    # tail while the others wait, then read it back (and find nothing left to fetch).
+    loaded = _load_history(ticker_symbol, start, force, interval, fetch_due, fetch=False, since=since)
+    if loaded is not None:
+        return loaded
+    try:
+        lock = get_backend().lock(f"history:{ticker_symbol.upper()}:{interval}")
+    except Exception:
+        lock = nullcontext()
+    with lock:
+        return _load_history(ticker_symbol, start, force, interval, fetch_due, since=since)
+
+def _refresh_entry(ticker_symbol, interval, force=True, since=None):
+    # Refetch the tail (unless another worker just did, without `force`, or did after
+    # `since`) and swap it into the memo; entries are (covered, bars, stale since)
+    key = (ticker_symbol.upper(), interval)
+    covered, bars, _ = _load_history_shared(ticker_symbol, _fetch_start(HISTORY_START, interval), force, interval,
+                                            fetch_due=True, since=since)
+    entry = (covered, Bars.from_frame(bars), None)
+    if not bars.empty:
+        HISTORY_CACHE.set(key, entry)
+    return entry
+
+def _stored_history(ticker_symbol, start, interval):
+    key = (ticker_symbol.upper(), interval)
+    start = _fetch_start(start, interval)
+
+    def load():
+        covered, bars, due = _load_history_shared(ticker_symbol, start, interval=interval)
+        if due is not None:
+            # Tail due: refreshed in the background; if that is slow or refused the
+            # stored bars are served, marked stale, in the meantime
+            entry, stale = fetch_or_stale(("history",) + key, lambda: _refresh_entry(ticker_symbol, interval, force=False), None)
+            if not stale:
+                return entry
+        return covered, Bars.from_frame(bars), due
+
+    covered, bars, stale = HISTORY_CACHE.get_or_fetch(key, load)
+    if pd.Timestamp(covered) > pd.Timestamp(start):
+        HISTORY_CACHE.pop(key)
+        covered, bars, stale = HISTORY_CACHE.get_or_fetch(key, load)
+    if not len(bars):
+        HISTORY_CACHE.pop(key)
+        return bars.frame()
+    if stale is not None:
+        note_stale("history", stale)
+        revalidate(("history",) + key, lambda: _refresh_entry(ticker_symbol, interval, force=False))
+    return _slice_from(bars.frame(), start)
+
+def _resampled_history(ticker_symbol, start, interval):
+    # Derived from the source interval's bars; after a tail refresh only the last bins are redone
+    source = _stored_history(ticker_symbol, start, INTERVALS[interval])
+    key = (ticker_symbol.upper(), interval)
+    version = data_version(source)
+    cached = RESAMPLED_CACHE.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1].frame()
+    resume = resume_point(cached[0], source) if cached is not None else 0
+    bars = resample_tail(source, interval, cached[1].frame() if cached is not None else None, resume)
+    RESAMPLED_CACHE.set(key, (version, Bars.from_frame(bars)))
+    return bars
+
+def get_history(ticker_symbol, start=HISTORY_START, interval="1d"):
+    # interval: one of INTERVALS; minute bars only reach back INTRADAY_DAYS
+    _count_request(ticker_symbol)
+    if INTERVALS[interval]:
+        return _resampled_history(ticker_symbol, start, interval)
+    return _stored_history(ticker_symbol, start, interval)
+
+def refresh_history(ticker_symbol, interval="1d", since=None):
+    # Fetch the tail now and swap it into the memo, so readers never wait on upstream.
+    # With `since` (epoch seconds), a store another worker checked since then is only read.
+    return _refresh_entry(ticker_symbol, interval, since=since)[1].frame()
+
+# Where each ticker's minute bars begin (None if it has none), so zooming on a ticker
+# without intraday data doesn't ask upstream again on every relayout
+INTRADAY_STARTS = TTLCache(maxsize=512, ttl=INTRADAY_REFRESH_SECONDS, name="intraday_start")
+
+def _load_intraday_start(ticker_symbol):
+    try:
+        bars = get_history(ticker_symbol, interval="1m")
+    except Exception:
+        return None
+    return bars.index[0] if not bars.empty else None
+
+def _intraday_start(ticker_symbol):
+    return INTRADAY_STARTS.get_or_fetch(ticker_symbol.upper(), lambda: _load_intraday_start(ticker_symbol))
+
+def series_key(ticker_symbol, interval):
+    # Indicator and range-index caches are per ticker and bar interval
+    return ticker_symbol if interval == "1d" else f"{ticker_symbol}:{interval}"
+
+def view_history(ticker_symbol, relayoutData=None):
+    # (interval, bars) at the finest resolution whose bars over the visible x-range fit
+    # the point budget; the unzoomed view spans the whole daily history
+    daily = get_history(ticker_symbol)
+    if daily.empty:
+        return "1d", daily
+    rng = visible_range(relayoutData, daily.index) or (daily.index[0], daily.index[-1])
+    interval = choose_interval(*rng, intraday_start=lambda: _intraday_start(ticker_symbol),
+                               budget=pixel_budget(relayoutData))
+    if interval == "1d":
+        return interval, daily
+    bars = get_history(ticker_symbol, interval=interval)
+    return (interval, bars) if not bars.empty else ("1d", daily)
+
+# Upper bound on concurrent upstream fetches for multi-ticker requests
+HISTORY_WORKERS = 8
+
+# (ticker, start, column) -> (bars version, date-aligned series), so a universe of
+# hundreds of tickers is only re-aligned for the tickers whose bars changed
+DAILY_SERIES_CACHE = TTLCache(maxsize=1024, ttl=24 * 60 * 60, name="daily_series")
+
+def _daily_series(ticker_symbol, start, column):
+    try:
+        hist = get_history(ticker_symbol, start)
+    except Exception:
+        return None
+    if hist.empty or column not in hist.columns:
+        return None
+    key = (ticker_symbol.upper(), str(start), column)
+    version = data_version(hist)
+    cached = DAILY_SERIES_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, _align_daily(hist[column]))
+        DAILY_SERIES_CACHE.set(key, cached)
+    return cached[1]
+
+def _align_daily(series):
+    # Exchanges sit in different timezones; align on the calendar date. Flooring the
+    # datetime64 values directly skips normalize()'s frequency inference.
+    index = series.index.tz_localize(None) if series.index.tz is not None else series.index
+    days = index.to_numpy().astype("datetime64[D]").astype(index.dtype)
+    series = series.set_axis(pd.DatetimeIndex(days, name=index.name))
+    return series[~series.index.duplicated(keep="last")]
+
+def get_histories(tickers, start=HISTORY_START, column="Close"):
+    tickers = list(dict.fromkeys(t for t in tickers if t))
+    if not tickers:
+        return pd.DataFrame()
+    with ThreadPoolExecutor(max_workers=min(HISTORY_WORKERS, len(tickers))) as pool:
+        series = list(pool.map(lambda t: _daily_series(t, start, column), tickers))
+    columns = {t: s for t, s in zip(tickers, series) if s is not None}
+    if not columns:
+        return pd.DataFrame()
+    # Outer join by position in the union of all dates; pd.concat's pairwise index
+    # unions dominate once there are hundreds of columns
+    dates = np.unique(np.concatenate([s.index.to_numpy() for s in columns.values()]))
+    values = np.full((len(dates), len(columns)), np.nan)
+    for i, s in enumerate(columns.values()):
+        values[np.searchsorted(dates, s.index.to_numpy()), i] = s.to_numpy(dtype=float)
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name="Date"), columns=list(columns))
+
+# Raw upstream `info` fields, cached unformatted so callers can do arithmetic on them
+METRIC_FIELDS = [
+    "trailingPE", "beta", "volume", "open", "previousClose", "dividendDate",
+    "earningsDate", "fiftyTwoWeekLow", "fiftyTwoWeekHigh", "recommendationKey",
+]
+# Quotes are fresh for METRICS_FRESH_SECONDS, but kept for a day to cover upstream outages
+METRICS_FRESH_SECONDS = 5 * 60
+METRICS_CACHE = TTLCache(maxsize=512, ttl=24 * 60 * 60, shared="metrics")
+
+def _format_metrics(raw):
+    return {
+        "pe": f"{raw['trailingPE']:.3f}" if raw.get("trailingPE") else "N/A",
+        "beta": f"{raw['beta']:.3f}" if raw.get("beta") else "N/A",
+        "volume": format_number(raw.get("volume", "N/A")),
+        "open": format_number(raw.get("open", "N/A")),
+        "last_close": format_number(raw.get("previousClose", "N/A")),
+        "dividend_date": format_date(raw.get("dividendDate", "N/A")),
+        "earnings_date": format_date(raw.get("earningsDate", "N/A")),
+        "week52_low": format_number(raw.get("fiftyTwoWeekLow", "N/A")),
+        "week52_high": format_number(raw.get("fiftyTwoWeekHigh", "N/A")),
+        "analyst": (raw.get("recommendationKey", "N/A") or "N/A").upper(),
+    }
+
+def _load_metrics(ticker_symbol):
+    info = upstream_call("info", ticker_symbol)
+    raw = {k: info[k] for k in METRIC_FIELDS if info.get(k) is not None}
+    return {"raw": raw, "formatted": _format_metrics(raw), "fetched": time.time()}
+
+def _cached_metrics(ticker_symbol):
+    key = ticker_symbol.upper()
+    _count_request(key)
+    metrics = METRICS_CACHE.get_or_fetch(key, lambda: _load_metrics(ticker_symbol))
+    if time.time() - metrics.get("fetched", 0) > METRICS_FRESH_SECONDS:
+        since = time.time() - METRICS_FRESH_SECONDS
+        metrics, stale = fetch_or_stale(("info", key), lambda: refresh_metrics(ticker_symbol, since), metrics)
+        if stale:
+            note_stale("metrics", metrics.get("fetched"))
+    return metrics
+
+def refresh_metrics(ticker_symbol, since=None):
+    # Fetch the quote now, or with `since` (epoch seconds) only if the shared one is older;
+    # workers refreshing at once make one upstream call between them
+    fresh = None if since is None else (lambda metrics: metrics.get("fetched", 0) >= since)
+    return METRICS_CACHE.refresh(ticker_symbol.upper(), lambda: _load_metrics(ticker_symbol), fresh)
+
+def fetch_raw_metrics(ticker_symbol):
+    return dict(_cached_metrics(ticker_symbol)["raw"])
 
 def fetch_metrics(ticker_symbol):
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
-
-        return {
-            "pe": f"{info.get('trailingPE', 'N/A'):.3f}" if info.get("trailingPE") else "N/A",
-            "beta": f"{info.get('beta', 'N/A'):.3f}" if info.get("beta") else "N/A",
-            "volume": format_number(info.get("volume", "N/A")),
-            "open": format_number(info.get("open", "N/A")),
-            "last_close": format_number(info.get("previousClose", "N/A")),
-            "dividend_date": format_date(info.get("dividendDate", "N/A")),
-            "earnings_date": format_date(info.get("earningsDate", "N/A")),
-            "week52_low": format_number(info.get("fiftyTwoWeekLow", "N/A")),
-            "week52_high": format_number(info.get("fiftyTwoWeekHigh", "N/A")),
-            "analyst": (info.get("recommendationKey", "N/A") or "N/A").upper(),
-        }
+        return dict(_cached_metrics(ticker_symbol)["formatted"])
     except Exception:
         return {k: "N/A" for k in [
             "pe", "beta", "volume", "open", "last_close",
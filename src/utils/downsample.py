@@ -0,0 +1,146 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Points sent per visible x-range: about one per horizontal pixel of a full-width graph
+POINT_BUDGET = 1200
+
+def visible_range(relayoutData, index=None):
+    # Stacked subplots share one x-axis, so a zoom on any of them (xaxis2, xaxis3...) counts
+    start = end = None
+    for key, value in (relayoutData or {}).items():
+        if not key.startswith("xaxis"):
+            continue
+        if key.endswith(".range[0]"):
+            start = value
+        elif key.endswith(".range[1]"):
+            end = value
+        elif key.endswith(".range"):
+            start, end = value
+    if start is None or end is None:
+        return None
+    start, end = pd.to_datetime(start), pd.to_datetime(end)
+    if index is not None and getattr(index, "tz", None) is not None:
+        start, end = start.tz_localize(index.tz), end.tz_localize(index.tz)
+    return start, end
+
+def is_xaxis_event(relayoutData):
+    return any(key.startswith("xaxis") for key in (relayoutData or {}))
+
+def pixel_budget(relayoutData, default=POINT_BUDGET):
+    # Plotly only reports its size on some relayout events; otherwise assume a full-width graph
+    width = (relayoutData or {}).get("width")
+    return int(width) if width else default
+
+def _visible_rows(index, relayoutData):
+    rng = visible_range(relayoutData, index)
+    if rng is None:
+        return 0, len(index)
+    return index.searchsorted(rng[0]), index.searchsorted(rng[1], side="right")
+
+def _window(index, relayoutData):
+    # Rows to send and how many points they may use: the visible range gets the full
+    # budget, plus one range-width of padding either side so short pans don't show gaps
+    n = len(index)
+    budget = pixel_budget(relayoutData)
+    if visible_range(relayoutData) is None:
+        return 0, n, budget
+    lo, hi = _visible_rows(index, relayoutData)
+    visible = max(hi - lo, 1)
+    lo, hi = max(lo - visible, 0), min(hi + visible, n)
+    return lo, hi, int(budget * (hi - lo) / visible)
+
+# What a figure currently holds: the row window sent and its point density (1.0 = every bar).
+# Kept client-side in a dcc.Store so zoom callbacks can tell whether new data is needed.
+def window_state(index, relayoutData=None):
+    lo, hi, target = _window(index, relayoutData)
+    return {"lo": int(lo), "hi": int(hi), "density": min(1.0, target / max(hi - lo, 1))}
+
+def needs_refresh(state, index, relayoutData):
+    if not state:
+        return True
+    lo, hi = _visible_rows(index, relayoutData)
+    if lo < state["lo"] or hi > state["hi"]:
+        return True
+    # Re-send only when the view needs finer buckets than the ones already on the client
+    needed = min(1.0, pixel_budget(relayoutData) / max(hi - lo, 1))
+    return math.ceil(1 / needed) < math.ceil(1 / state["density"])
+
+# Approximate bars per calendar day at each intraday interval (a 390-minute session, 5 days a week)
+BARS_PER_DAY = {"1m": 390 * 5 / 7, "5m": 78 * 5 / 7, "1h": 7 * 5 / 7}
+
+def choose_interval(start, end, intraday_start=None, budget=POINT_BUDGET):
+    # Finest intraday interval whose bars over [start, end] fit the point budget, else
+    # daily: longer views are bucketed from daily bars (ohlc_buckets) rather than drawn
+    # from weekly ones, so daily indicators keep their meaning at every zoom level.
+    # `intraday_start` is a callable returning where stored intraday bars begin (or
+    # None); it is only called once an intraday interval would fit, since answering it
+    # may mean a fetch.
+    days = max((end - start) / pd.Timedelta(days=1), 1 / 24)
+    first = False
+    for interval, per_day in BARS_PER_DAY.items():
+        if days * per_day > budget:
+            continue
+        if first is False:
+            first = intraday_start() if intraday_start else None
+        if first is None or start < first:
+            continue
+        return interval
+    return "1d"
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets; returns the indices of the points to keep
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+def downsample_line(series, relayoutData=None):
+    lo, hi, target = _window(series.index, relayoutData)
+    series = series.iloc[lo:hi]
+    valid = np.flatnonzero(np.isfinite(series.to_numpy(dtype="float64")))
+    if target >= len(valid):
+        return series
+    x = series.index.asi8[valid] if isinstance(series.index, pd.DatetimeIndex) else valid
+    return series.iloc[valid[lttb(x, series.to_numpy(dtype="float64")[valid], target)]]
+
+def ohlc_buckets(data, target):
+    # Merge runs of k consecutive bars into one bar; any extra columns (overlays) keep
+    # the value at the end of each bucket so they stay aligned with the bucket close
+    n = len(data)
+    if target >= n:
+        return data
+    k = math.ceil(n / max(target, 1))
+    starts = np.arange(0, n, k)
+    ends = np.minimum(starts + k, n) - 1
+    out = {}
+    for col in data.columns:
+        values = data[col].to_numpy()
+        if col == "Open":
+            out[col] = values[starts]
+        elif col == "High":
+            out[col] = np.fmax.reduceat(values, starts)
+        elif col == "Low":
+            out[col] = np.fmin.reduceat(values, starts)
+        elif col == "Volume":
+            out[col] = np.add.reduceat(values, starts)
+        else:
+            out[col] = values[ends]
+    return pd.DataFrame(out, index=data.index[starts])
+
+def downsample_ohlc(data, relayoutData=None):
+    lo, hi, target = _window(data.index, relayoutData)
+    return ohlc_buckets(data.iloc[lo:hi], target)
@@ -0,0 +1,47 @@
+import json
+import plotly.io.json as pio_json
+from .background import PreEncoded, in_background_job
+from .cache import TTLCache
+from .downsample import pixel_budget, visible_range
+from .indicators import data_version
+
+try:
+    import orjson
+except ImportError:  # optional; without it cached figures are decoded and re-encoded per response
+    orjson = None
+
+# Serialized figures keyed by chart, ticker, interval, options, view and bars version, so
+# the popular views (every user's first look at a ticker) skip both the figure build and
+# the JSON encode. A new bars version is a new key; superseded entries age out of the LRU.
+# Entries are the JSON text, shared across workers and background callback jobs.
+FIGURE_CACHE = TTLCache(maxsize=128, ttl=60 * 60, shared="figures", name="figures")
+
+def _passthrough():
+    # Dash encodes responses with plotly's to_json_plotly, which only leaves an
+    # orjson.Fragment untouched when it's using the orjson engine
+    return (orjson is not None and hasattr(orjson, "Fragment")
+            and pio_json.config.default_engine in ("auto", "orjson"))
+
+def encode_figure(text):
+    # Cached JSON text as a callback return value. An orjson.Fragment can't be pickled,
+    # so a background job returns the text itself, wrapped when its result is polled.
+    if _passthrough():
+        return PreEncoded(text) if in_background_job() else orjson.Fragment(text)
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+def figure_key(chart, ticker_symbol, interval, data, relayoutData, *options):
+    rng = visible_range(relayoutData)
+    view = None if rng is None else (str(rng[0]), str(rng[1]))
+    return (chart, ticker_symbol.upper(), interval, data_version(data), view,
+            pixel_budget(relayoutData), options)
+
+def cached_figure(key, build):
+    # build() -> go.Figure. Figures without traces (errors, "no data") aren't cached.
+    text = FIGURE_CACHE.get(key)
+    if text is None:
+        fig = build()
+        if not fig.data:
+            return fig
+        text = pio_json.to_json_plotly(fig)
+        FIGURE_CACHE.set(key, text)
+    return encode_figure(text)
@@ -1,5 +1,5 @@
 import plotly.graph_objs as go
-import pandas as pd
+from .downsample import visible_range
 
 def empty_fig(title, message, chart_type="Chart"):
     fig = go.Figure()
@@ -11,16 +11,22 @@ def empty_fig(title, message, chart_type="Chart"):
     fig.update_layout(title=f"{title} {chart_type}", template="plotly_dark")
     return fig
 
-def handle_yrange(data, relayoutData):
+def handle_yrange(data, relayoutData, index=None):
+    # `index` is the ticker's RangeIndex (utils.range_index); without one the
+    # visible slice is scanned directly
     low_col = "Low" if "Low" in data.columns else "Close"
     high_col = "High" if "High" in data.columns else "Close"
 
-    if relayoutData and "xaxis.range[0]" in relayoutData:
-        start = pd.to_datetime(relayoutData["xaxis.range[0]"])
-        end = pd.to_datetime(relayoutData["xaxis.range[1]"])
-        if data.index.tz is not None:
-            start, end = start.tz_localize(data.index.tz), end.tz_localize(data.index.tz)
-        visible = data.loc[start:end]
+    rng = visible_range(relayoutData, data.index)
+    if index is not None:
+        full = index.minmax()
+        visible = index.minmax(*rng) if rng else None
+        if visible is not None:
+            y_min, y_max = max(visible[0], 0), visible[1]
+        else:
+            y_min, y_max = full
+    elif rng:
+        visible = data.loc[rng[0]:rng[1]]
         if not visible.empty:
             y_min, y_max = max(visible[low_col].min(), 0), visible[high_col].max()
         else:
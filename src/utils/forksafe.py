@@ -0,0 +1,53 @@
+import os
+import threading
+import weakref
+
+# A forked child (a report worker, any multiprocessing pool) has only the thread that
+# forked, so a lock another thread held at that moment would never be released there.
+# Every lock and semaphore of the data modules is made here, and one at-fork hook gives
+# the child fresh ones; after_fork() registers the rest of a module's per-process state
+# (in-flight maps, thread pools, connections) with the same hook.
+_primitives = weakref.WeakSet()
+_resets = []
+
+class _ForkSafe:
+    __slots__ = ("_make", "_inner", "__weakref__")
+
+    def __init__(self, make):
+        self._make = make
+        self._inner = make()
+        _primitives.add(self)
+
+    def acquire(self, *args, **kwargs):
+        return self._inner.acquire(*args, **kwargs)
+
+    def release(self):
+        self._inner.release()
+
+    def __enter__(self):
+        return self._inner.__enter__()
+
+    def __exit__(self, *exc):
+        return self._inner.__exit__(*exc)
+
+    def _reset(self):
+        self._inner = self._make()
+
+def Lock():
+    return _ForkSafe(threading.Lock)
+
+def BoundedSemaphore(value):
+    return _ForkSafe(lambda: threading.BoundedSemaphore(value))
+
+def after_fork(reset):
+    # reset() runs in every forked child, after the locks are fresh
+    _resets.append(reset)
+    return reset
+
+def _after_fork():
+    for primitive in list(_primitives):
+        primitive._reset()
+    for reset in _resets:
+        reset()
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,298 @@
+import contextvars
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from .cache_backend import get_backend
+from .forksafe import BoundedSemaphore, Lock, after_fork
+from .instrumentation import STALE_SERVED, UPSTREAM_CIRCUIT, UPSTREAM_REJECTED, upstream
+from .providers import get_provider
+
+logger = logging.getLogger(__name__)
+
+# Every upstream call goes through a per-provider gateway: a token-bucket request budget
+# and a circuit breaker that backs off exponentially while upstream keeps failing, both
+# shared by every process on the host, and a per-process cap on concurrent calls. Callers that have something cached use fetch_or_stale(): the
+# refresh runs on a background pool and, when upstream is slow, throttled or down, the
+# cached value is served at once (noted as stale) while the refresh carries on.
+
+# Requests per second and burst; the default rate comes from the provider (None: no budget)
+UPSTREAM_RATE = os.environ.get("STOCK_UPSTREAM_RATE")
+UPSTREAM_BURST = int(os.environ.get("STOCK_UPSTREAM_BURST", "10"))
+UPSTREAM_CONCURRENCY = int(os.environ.get("STOCK_UPSTREAM_CONCURRENCY", "4"))
+# Longest a call waits for a token or a free slot before it is refused
+QUEUE_SECONDS = 5.0
+# How long a half-open probe may take before another process may probe instead
+PROBE_SECONDS = 60.0
+# The shared budget and breaker state outlive idle periods by this much
+STATE_SECONDS = 24 * 60 * 60
+# Consecutive failures that open the circuit; it stays open for BACKOFF_SECONDS, doubling
+# (up to MAX_BACKOFF_SECONDS) every time the probe after a cooldown fails too
+FAILURE_THRESHOLD = 5
+BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 300.0
+# How long a request with cached data waits for a refresh before serving the cache
+STALE_DEADLINE = float(os.environ.get("STOCK_STALE_DEADLINE", "1.0"))
+REVALIDATE_WORKERS = 4
+
+class UpstreamUnavailable(Exception):
+    # Refused without calling upstream; `reason` is "circuit", "budget" or "busy"
+    def __init__(self, op, reason):
+        super().__init__(f"upstream {op} refused: {reason}")
+        self.reason = reason
+
+class SharedState:
+    # A small value every process on the host sees: kept in the process-shared backend
+    # under `key` and changed under the backend's lock, so the budget and the breaker
+    # cover all workers, background jobs and report processes together. Without a key
+    # (or while the backend fails) the process's own copy is used.
+    def __init__(self, key, initial):
+        self.key = key
+        self._local = initial
+        self._lock = Lock()
+
+    def get(self):
+        if self.key is not None:
+            try:
+                self._local = get_backend().get(self.key, self._local)
+            except Exception:
+                pass
+        return self._local
+
+    def update(self, change):
+        # change(state) -> (new state, result); returns result
+        with self._lock:
+            if self.key is not None:
+                try:
+                    backend = get_backend()
+                    with backend.lock(self.key, ttl=5, timeout=QUEUE_SECONDS):
+                        state, result = change(backend.get(self.key, self._local))
+                        backend.set(self.key, state, STATE_SECONDS)
+                    self._local = state
+                    return result
+                except Exception:
+                    logger.debug("shared gateway state %s unavailable", self.key, exc_info=True)
+            self._local, result = change(self._local)
+            return result
+
+class TokenBucket:
+    # State: (tokens, wall time of the last refill)
+    def __init__(self, rate, burst, shared=None):
+        self.rate, self.burst = rate, burst
+        self._state = SharedState(shared, (float(burst), time.time()))
+
+    def _level(self, state, now):
+        tokens, at = state
+        return min(self.burst, tokens + max(now - at, 0) * self.rate)
+
+    def available(self):
+        return self._level(self._state.get(), time.time()) >= 1
+
+    def take(self, timeout):
+        # Wait for a token if one comes within `timeout`
+        def change(state):
+            now = time.time()
+            tokens = self._level(state, now)
+            wait = (1 - tokens) / self.rate if tokens < 1 else 0.0
+            if wait > timeout:
+                return (tokens, now), None
+            return (tokens - 1, now), wait
+
+        wait = self._state.update(change)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+class CircuitBreaker:
+    # State: (consecutive failures, times opened, open until, probe running until), wall time
+    CLOSED = (0, 0, 0.0, 0.0)
+
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                 shared=None):
+        self.name = name
+        self.threshold, self.backoff, self.max_backoff = threshold, backoff, max_backoff
+        self._state = SharedState(shared, self.CLOSED)
+
+    def is_open(self):
+        _, trips, open_until, probing = self._state.get()
+        now = time.time()
+        return trips > 0 and (now < open_until or now < probing)
+
+    def allow(self):
+        # Closed: everything passes. Open: nothing until the cooldown is over, then a
+        # single probe (across all processes) whose outcome closes the circuit or
+        # reopens it for longer. Only that transition takes the lock; the closed and
+        # cooling-down answers come from a plain read, as in success().
+        _, trips, open_until, probing = self._state.get()
+        if not trips:
+            return True
+        now = time.time()
+        if now < open_until or now < probing:
+            return False
+
+        def change(state):
+            failures, trips, open_until, probing = state
+            now = time.time()
+            if not trips:
+                return state, True
+            if now < open_until or now < probing:
+                return state, False
+            return (failures, trips, open_until, now + PROBE_SECONDS), True
+        return self._state.update(change)
+
+    def abandon(self):
+        # The call allow() let through never reached upstream
+        self._state.update(lambda state: ((*state[:3], 0.0), None))
+
+    def success(self):
+        # Nearly always already closed: a read, not a locked write, per upstream call
+        if self._state.get() != self.CLOSED and self._state.update(lambda state: (self.CLOSED, state[1] > 0)):
+            logger.info("upstream %s circuit closed", self.name)
+        UPSTREAM_CIRCUIT.set(0, provider=self.name)
+
+    def failure(self, throttled=False):
+        # Being throttled opens the circuit straight away
+        def change(state):
+            failures, trips, open_until, _ = state
+            failures += 1
+            if not (throttled or trips or failures >= self.threshold):
+                return (failures, trips, open_until, 0.0), None
+            cooldown = min(self.backoff * 2 ** trips, self.max_backoff)
+            return (failures, trips + 1, time.time() + cooldown * random.uniform(0.8, 1.2), 0.0), cooldown
+
+        cooldown = self._state.update(change)
+        if cooldown is not None:
+            logger.warning("upstream %s circuit open for %.0fs", self.name, cooldown)
+            UPSTREAM_CIRCUIT.set(1, provider=self.name)
+
+def _throttled(exc):
+    # yfinance's YFRateLimitError, or an HTTP 429 surfaced by any client
+    return "RateLimit" in type(exc).__name__ or "429" in str(exc) or "Too Many Requests" in str(exc)
+
+class Gateway:
+    def __init__(self, name, rate=None, burst=UPSTREAM_BURST, concurrency=UPSTREAM_CONCURRENCY):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, shared=f"gateway:{name}:bucket") if rate else None
+        self.breaker = CircuitBreaker(name, shared=f"gateway:{name}:breaker")
+        self.concurrency = concurrency
+        self._slots = BoundedSemaphore(concurrency)
+
+    def ready(self):
+        # Whether a call made now would start without waiting on the budget or the breaker
+        return not self.breaker.is_open() and (self.bucket is None or self.bucket.available())
+
+    def _refuse(self, op, reason):
+        UPSTREAM_REJECTED.inc(op=op, provider=self.name, reason=reason)
+        raise UpstreamUnavailable(op, reason)
+
+    def call(self, op, fn, *args, **kwargs):
+        if not self.breaker.allow():
+            self._refuse(op, "circuit")
+        if self.bucket is not None and not self.bucket.take(QUEUE_SECONDS):
+            self.breaker.abandon()
+            self._refuse(op, "budget")
+        if not self._slots.acquire(timeout=QUEUE_SECONDS):
+            self.breaker.abandon()
+            self._refuse(op, "busy")
+        try:
+            with upstream(op, self.name):
+                result = fn(*args, **kwargs)
+        except Exception as exc:
+            self.breaker.failure(_throttled(exc))
+            raise
+        finally:
+            self._slots.release()
+        self.breaker.success()
+        return result
+
+_gateways = {}
+_gateways_lock = Lock()
+
+def get_gateway(provider):
+    with _gateways_lock:
+        gateway = _gateways.get(provider.name)
+        if gateway is None:
+            rate = float(UPSTREAM_RATE) if UPSTREAM_RATE else provider.rate_limit
+            gateway = _gateways[provider.name] = Gateway(provider.name, rate)
+        return gateway
+
+def upstream_call(op, *args, **kwargs):
+    # provider.<op>(*args, **kwargs) through the provider's gateway
+    provider = get_provider()
+    return get_gateway(provider).call(op, getattr(provider, op), *args, **kwargs)
+
+# Background refreshes, at most one in flight per key
+_pool = None
+_inflight = {}
+_inflight_lock = Lock()
+
+@after_fork
+def _forget_threads():
+    # A forked child starts its own pool; the parent's refresh threads don't exist there
+    global _pool
+    _pool = None
+    _inflight.clear()
+
+def _start(key, refresh):
+    # (future, whether this call started it)
+    global _pool
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="revalidate")
+        future = _inflight[key] = _pool.submit(refresh)
+    future.add_done_callback(lambda _: _forget(key, future))
+    return future, True
+
+def revalidate(key, refresh):
+    # Start refresh() in the background unless it is already running for `key`
+    return _start(key, refresh)[0]
+
+def _forget(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+def fetch_or_stale(key, refresh, stale, deadline=None):
+    # (value, is_stale): refresh()'s result if it finishes within `deadline`, otherwise
+    # `stale` while the refresh goes on. Only the request that starts a refresh waits,
+    # and not at all when upstream is refusing calls.
+    future, started = _start(key, refresh)
+    ready = started and get_gateway(get_provider()).ready()
+    wait = (STALE_DEADLINE if deadline is None else deadline) if ready else 0
+    try:
+        return future.result(timeout=wait), False
+    except Exception:
+        return stale, True
+
+# What a callback served stale: collected with `with stale_notes() as notes:`
+_notes = contextvars.ContextVar("stale_notes", default=None)
+
+@contextmanager
+def stale_notes():
+    notes = []
+    token = _notes.set(notes)
+    try:
+        yield notes
+    finally:
+        _notes.reset(token)
+
+def note_stale(what, as_of):
+    # `as_of`: epoch seconds the stale data was last refreshed
+    STALE_SERVED.inc(data=what)
+    notes = _notes.get()
+    if notes is not None:
+        notes.append((what, as_of))
+
+def stale_message(notes):
+    if not notes:
+        return ""
+    as_of = min(t for _, t in notes)
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(as_of)) if as_of else "earlier"
+    return f"Upstream unavailable: showing data as of {when}, refreshing in the background"
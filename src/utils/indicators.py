@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from .cache import TTLCache
+
+# Every indicator is computed by fn(arrays, start, prev, **params) -> {output: values[start:]}.
+# `arrays` holds the full float64 OHLCV columns; `prev` holds the outputs already known for
+# rows [:start] (None when starting from scratch), so recursive indicators can resume from
+# their last value and windowed ones only re-read the trailing window.
+
+def _ema(values, alpha, seed=np.nan):
+    # Exponential smoothing (adjust=False), optionally continuing from a previous value
+    if np.isnan(seed):
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    out = pd.Series(np.concatenate([[seed], values])).ewm(alpha=alpha, adjust=False).mean()
+    return out.to_numpy()[1:]
+
+def _last(prev, key, start):
+    return prev[key][start - 1] if prev is not None and start > 0 else np.nan
+
+def sma(arrays, start, prev, window=20):
+    close = arrays["Close"]
+    n = len(close) - start
+    lo = max(start - window + 1, 0)
+    csum = np.concatenate([[0.0], np.cumsum(close[lo:])])
+    out = np.full(len(close) - lo, np.nan)
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return {"value": out[len(out) - n:]}
+
+def ema(arrays, start, prev, span=20):
+    return {"value": _ema(arrays["Close"][start:], 2 / (span + 1), _last(prev, "value", start))}
+
+def bbands(arrays, start, prev, window=20, k=2.0):
+    close = arrays["Close"]
+    n = len(close) - start
+    lo = max(start - window + 1, 0)
+    mid = np.full(len(close) - lo, np.nan)
+    std = np.full(len(close) - lo, np.nan)
+    if len(close) - lo >= window:
+        views = sliding_window_view(close[lo:], window)
+        mid[window - 1:] = views.mean(axis=1)
+        std[window - 1:] = views.std(axis=1)
+    mid, std = mid[len(mid) - n:], std[len(std) - n:]
+    return {"upper": mid + k * std, "middle": mid, "lower": mid - k * std}
+
+def rsi(arrays, start, prev, period=14):
+    # Wilder's RSI; the smoothed gain/loss are carried as hidden outputs to resume from
+    close = arrays["Close"]
+    lo = max(start - 1, 0)
+    delta = np.diff(close[lo:])
+    gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    alpha = 1 / period
+    avg_gain = _ema(gain, alpha, _last(prev, "_gain", start))
+    avg_loss = _ema(loss, alpha, _last(prev, "_loss", start))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    if start == 0:
+        # Row 0 has no delta
+        avg_gain, avg_loss, value = (np.concatenate([[np.nan], a]) for a in (avg_gain, avg_loss, value))
+    # The first `period` rows are warm-up
+    value[:max(period - start, 0)] = np.nan
+    return {"value": value, "_gain": avg_gain, "_loss": avg_loss}
+
+def macd(arrays, start, prev, fast=12, slow=26, signal=9):
+    close = arrays["Close"][start:]
+    fast_ema = _ema(close, 2 / (fast + 1), _last(prev, "_fast", start))
+    slow_ema = _ema(close, 2 / (slow + 1), _last(prev, "_slow", start))
+    line = fast_ema - slow_ema
+    signal_line = _ema(line, 2 / (signal + 1), _last(prev, "signal", start))
+    return {"macd": line, "signal": signal_line, "hist": line - signal_line,
+            "_fast": fast_ema, "_slow": slow_ema}
+
+def atr(arrays, start, prev, period=14):
+    high, low, close = arrays["High"][start:], arrays["Low"][start:], arrays["Close"]
+    prev_close = close[start - 1:-1] if start > 0 else np.concatenate([[np.nan], close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return {"value": _ema(true_range, 1 / period, _last(prev, "value", start))}
+
+def vwap(arrays, start, prev):
+    # Anchored at the first bar of the loaded history
+    typical = (arrays["High"][start:] + arrays["Low"][start:] + arrays["Close"][start:]) / 3
+    volume = arrays["Volume"][start:]
+    cum_pv = np.nancumsum(typical * volume) + np.nan_to_num(_last(prev, "_pv", start))
+    cum_v = np.nancumsum(volume) + np.nan_to_num(_last(prev, "_v", start))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+    return {"value": value, "_pv": cum_pv, "_v": cum_v}
+
+INDICATORS = {
+    "SMA": sma,
+    "EMA": ema,
+    "BBANDS": bbands,
+    "RSI": rsi,
+    "MACD": macd,
+    "ATR": atr,
+    "VWAP": vwap,
+}
+
+# (ticker, indicator, params) -> (data version, outputs over the whole history)
+INDICATOR_CACHE = TTLCache(maxsize=512, ttl=24 * 60 * 60, name="indicators")
+
+def data_version(data):
+    # Bars are append-only apart from the last one, so length + the edge bars identify a version
+    n = len(data)
+    if not n:
+        return (0,)
+    return (n, data.index[0].value, data.index[max(n - 2, 0)].value,
+            data.index[-1].value, float(data["Close"].iloc[-1]))
+
+def _arrays(data):
+    return {col: data[col].to_numpy(dtype="float64") for col in ("Open", "High", "Low", "Close", "Volume")
+            if col in data.columns}
+
+def resume_point(version, data):
+    # Row from which cached outputs must be recomputed: the last cached bar (it may have been
+    # partial) onwards, or 0 if the history no longer starts with the cached one
+    if len(version) < 3 or version[0] < 2 or len(data) < version[0]:
+        return 0
+    n = version[0]
+    if data.index[0].value != version[1] or data.index[n - 2].value != version[2]:
+        return 0
+    return n - 1
+
+def indicator(ticker_symbol, data, name, **params):
+    key = (ticker_symbol.upper(), name, tuple(sorted(params.items())))
+    version = data_version(data)
+    cached = INDICATOR_CACHE.get(key)
+    if cached is not None and cached[0] == version:
+        outputs = cached[1]
+    else:
+        start = resume_point(cached[0], data) if cached is not None else 0
+        prev = cached[1] if start else None
+        tail = INDICATORS[name](_arrays(data), start, prev, **params)
+        outputs = {k: np.concatenate([prev[k][:start], v]) if start else v for k, v in tail.items()}
+        INDICATOR_CACHE.set(key, (version, outputs))
+    return pd.DataFrame({k: v for k, v in outputs.items() if not k.startswith("_")}, index=data.index)
@@ -0,0 +1,177 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from .forksafe import Lock
+
+logger = logging.getLogger(__name__)
+
+# Prometheus-style metrics kept in process memory and exposed at /metrics
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1 KiB .. 64 MiB
+
+def _escape(value):
+    # Pattern-matching callback outputs are JSON, so label values can contain quotes
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}{_labels(dict(k))} {v}" for k, v in self._values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        self._values = {}
+        self._lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # [cumulative bucket counts, sum, count]
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, n) in self._values.items():
+                labels = dict(key)
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {n}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(labels)} {n}")
+        return lines
+
+CALLBACK_SECONDS = Histogram("stock_callback_seconds", "Dash callback run time")
+CALLBACK_ERRORS = Counter("stock_callback_errors_total", "Exceptions caught inside callbacks")
+STAGE_SECONDS = Histogram("stock_stage_seconds", "Time per hot-path stage (fetch, compute, figure)")
+REQUEST_SECONDS = Histogram("stock_request_seconds", "Callback request time including JSON serialization")
+RESPONSE_BYTES = Histogram("stock_response_bytes", "Callback response payload size", BYTES_BUCKETS)
+UPSTREAM_SECONDS = Histogram("stock_upstream_seconds", "Upstream data provider latency")
+UPSTREAM_ERRORS = Counter("stock_upstream_errors_total", "Failed upstream provider calls")
+UPSTREAM_REJECTED = Counter("stock_upstream_rejected_total", "Upstream calls refused by the gateway (budget, busy, circuit)")
+UPSTREAM_CIRCUIT = Gauge("stock_upstream_circuit_open", "1 while the upstream circuit breaker is open")
+STALE_SERVED = Counter("stock_stale_served_total", "Cached data served stale while upstream was unavailable")
+CACHE_REQUESTS = Counter("stock_cache_requests_total", "Cache lookups by cache and result")
+CACHE_BYTES = Gauge("stock_cache_bytes", "Bytes held by size-budgeted caches")
+
+METRICS = [CALLBACK_SECONDS, CALLBACK_ERRORS, STAGE_SECONDS, REQUEST_SECONDS, RESPONSE_BYTES,
+           UPSTREAM_SECONDS, UPSTREAM_ERRORS, UPSTREAM_REJECTED, UPSTREAM_CIRCUIT, STALE_SERVED,
+           CACHE_REQUESTS, CACHE_BYTES]
+
+@contextmanager
+def stage(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, **labels)
+
+@contextmanager
+def upstream(op, provider):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(op=op, provider=provider)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, op=op, provider=provider)
+
+def record_error(callback):
+    # For the `except Exception:` fallbacks that keep the UI alive
+    CALLBACK_ERRORS.inc(callback=callback)
+    logger.warning("callback %s failed", callback, exc_info=True)
+
+def instrumented(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - start, callback=fn.__name__)
+    return wrapper
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+def register_metrics(server):
+    # /metrics for Prometheus, request timing/payload size for every callback request and,
+    # with STOCK_PROFILE=1 (or an `X-Profile: 1` header when STOCK_PROFILE=header),
+    # a cProfile summary of each callback request in the log
+    from flask import Response, g, request
+
+    profile_mode = os.environ.get("STOCK_PROFILE", "").lower()
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @server.before_request
+    def start_timer():
+        if request.path.endswith("_dash-update-component"):
+            g.stock_start = time.perf_counter()
+            if profile_mode in ("1", "on", "true") or (profile_mode == "header" and request.headers.get("X-Profile")):
+                g.stock_profile = cProfile.Profile()
+                g.stock_profile.enable()
+
+    @server.after_request
+    def record_request(response):
+        start = g.pop("stock_start", None)
+        if start is None:
+            return response
+        output = (request.get_json(silent=True) or {}).get("output", "unknown")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, output=output)
+        if response.content_length is not None:
+            RESPONSE_BYTES.observe(response.content_length, output=output)
+        profile = g.pop("stock_profile", None)
+        if profile is not None:
+            profile.disable()
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(25)
+            logger.info("profile for %s\n%s", output, out.getvalue())
+        return response
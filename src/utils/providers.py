@@ -0,0 +1,173 @@
+import json
+import os
+import zlib
+import numpy as np
+import pandas as pd
+
+# Upstream data sources behind get_history / fetch_metrics / search_symbols.
+# Select with STOCK_DATA_PROVIDER=yahoo|replay (replay reads STOCK_REPLAY_DIR if set).
+
+class DataProvider:
+    name = "base"
+    # Whether history()'s Dividends are already restated for later splits
+    adjusted_dividends = False
+    # Upstream request budget in requests per second (None: unlimited), see utils.gateway
+    rate_limit = None
+
+    def history(self, ticker_symbol, start, end=None, interval="1d"):
+        # interval: "1d" or "1m"; coarser views are resampled locally
+        raise NotImplementedError
+
+    def info(self, ticker_symbol):
+        raise NotImplementedError
+
+    def search(self, query, limit=10):
+        # [(symbol, label), ...]
+        raise NotImplementedError
+
+class YahooProvider(DataProvider):
+    name = "yahoo"
+    adjusted_dividends = True
+    rate_limit = 2.0
+
+    def history(self, ticker_symbol, start, end=None, interval="1d"):
+        import yfinance as yf
+        ticker = yf.Ticker(ticker_symbol)
+        return ticker.history(start=start, end=end if end is not None else pd.Timestamp.today(), interval=interval)
+
+    def info(self, ticker_symbol):
+        import yfinance as yf
+        return yf.Ticker(ticker_symbol).info
+
+    def search(self, query, limit=10):
+        from yahooquery import search
+        results = []
+        for q in search(query, first_quote=False, quotes_count=limit).get("quotes", [])[:limit]:
+            sym = q.get("symbol")
+            if not sym:
+                continue
+            results.append((sym, q.get("shortname") or q.get("shortName") or sym))
+        return results
+
+def synthetic_bars(ticker_symbol, periods, end, freq="B", tz="America/New_York", seed=None, vol=0.015):
+    # Geometric random walk seeded by the ticker, so every run sees identical bars;
+    # `vol` is the per-bar volatility
+    seed = zlib.crc32(ticker_symbol.upper().encode()) if seed is None else seed
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp(end), periods=periods, freq=freq, tz=tz, name="Date")
+    close = 50 + 150 * rng.random() * np.exp(np.cumsum(rng.normal(0.0002 * vol / 0.015, vol, periods)))
+    open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, vol / 5, periods))
+    spread = np.abs(rng.normal(0, vol * 2 / 3, periods)) * close
+    dividends = np.zeros(periods)
+    dividends[::63] = np.round(close[::63] * 0.004, 2)
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, periods).astype("float64"),
+        "Dividends": dividends,
+        "Stock Splits": np.zeros(periods),
+    }, index=index)
+
+class ReplayProvider(DataProvider):
+    # Offline provider: bars/info come from fixture files (<TICKER>.parquet|.csv, <TICKER>.json,
+    # minute bars in <TICKER>_1m.parquet|.csv) in `fixtures_dir`, falling back to a deterministic
+    # synthetic series of `periods` bars ending at `end` (and a week of minute bars scaled to
+    # match the daily closes). Repeated calls always return the same data.
+    name = "replay"
+    # Fixtures are recorded Yahoo bars (synthetic ones have no splits)
+    adjusted_dividends = True
+    INTRADAY_PERIODS = 7 * 24 * 60
+
+    def __init__(self, fixtures_dir=None, periods=1500, end=None, freq="B"):
+        self.fixtures_dir = fixtures_dir
+        self.periods = periods
+        self.end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+        self.freq = freq
+        self._bars = {}
+
+    def _fixture(self, ticker_symbol, ext):
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, f"{ticker_symbol.upper()}.{ext}")
+        return path if os.path.exists(path) else None
+
+    def _synthetic_minutes(self, key):
+        minutes = synthetic_bars(key, self.INTRADAY_PERIODS, self.end, "min",
+                                 seed=zlib.crc32(f"{key}:1m".encode()), vol=0.015 / np.sqrt(390))
+        minutes["Volume"] = (minutes["Volume"] / 390).round()
+        minutes["Dividends"] = 0.0
+        # Start from the daily close of the day the minutes begin, so zooming in stays continuous
+        anchor = self.bars(key)["Close"].asof(minutes.index[0])
+        if pd.notna(anchor):
+            prices = ["Open", "High", "Low", "Close"]
+            minutes[prices] *= anchor / minutes["Close"].iloc[0]
+        return minutes
+
+    def bars(self, ticker_symbol, interval="1d"):
+        key = ticker_symbol.upper()
+        if (key, interval) not in self._bars:
+            name = key if interval == "1d" else f"{key}_{interval}"
+            parquet, csv = self._fixture(name, "parquet"), self._fixture(name, "csv")
+            if parquet:
+                bars = pd.read_parquet(parquet)
+            elif csv:
+                bars = pd.read_csv(csv, index_col=0)
+                bars.index = pd.to_datetime(bars.index, utc=True).tz_convert("America/New_York")
+            elif interval == "1d":
+                bars = synthetic_bars(key, self.periods, self.end, self.freq)
+            else:
+                bars = self._synthetic_minutes(key)
+            self._bars[(key, interval)] = bars
+        return self._bars[(key, interval)]
+
+    def history(self, ticker_symbol, start, end=None, interval="1d"):
+        bars = self.bars(ticker_symbol, interval)
+        start, end = pd.Timestamp(start), pd.Timestamp(end if end is not None else pd.Timestamp.today())
+        if bars.index.tz is not None:
+            start = start.tz_localize(bars.index.tz) if start.tz is None else start
+            end = end.tz_localize(bars.index.tz) if end.tz is None else end
+        return bars.iloc[bars.index.searchsorted(start):bars.index.searchsorted(end)]
+
+    def info(self, ticker_symbol):
+        path = self._fixture(ticker_symbol, "json")
+        if path:
+            with open(path) as f:
+                return json.load(f)
+        bars = self.bars(ticker_symbol)
+        year = bars.iloc[-252:]
+        return {
+            "trailingPE": 10 + zlib.crc32(ticker_symbol.upper().encode()) % 40,
+            "beta": round(0.5 + (zlib.crc32(ticker_symbol.lower().encode()) % 150) / 100, 3),
+            "volume": float(bars["Volume"].iloc[-1]),
+            "open": float(bars["Open"].iloc[-1]),
+            "previousClose": float(bars["Close"].iloc[-2]) if len(bars) > 1 else None,
+            "fiftyTwoWeekLow": float(year["Low"].min()),
+            "fiftyTwoWeekHigh": float(year["High"].max()),
+            "recommendationKey": "hold",
+        }
+
+    def search(self, query, limit=10):
+        if not self.fixtures_dir or not os.path.isdir(self.fixtures_dir):
+            return []
+        query = query.strip().upper()
+        symbols = sorted({os.path.splitext(f)[0] for f in os.listdir(self.fixtures_dir)})
+        return [(sym, sym) for sym in symbols if sym.startswith(query)][:limit]
+
+PROVIDERS = {"yahoo": YahooProvider, "replay": ReplayProvider}
+_provider = None
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        name = os.environ.get("STOCK_DATA_PROVIDER", "yahoo")
+        if name == "replay":
+            _provider = ReplayProvider(fixtures_dir=os.environ.get("STOCK_REPLAY_DIR"))
+        else:
+            _provider = PROVIDERS[name]()
+    return _provider
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
@@ -0,0 +1,115 @@
+import numpy as np
+from .cache import TTLCache
+from .forksafe import Lock
+from .indicators import data_version
+
+def epoch_ns(index):
+    # asi8 follows the index's resolution (ns or us depending on pandas version)
+    return index.values.astype("datetime64[ns]", copy=False).view("int64")
+
+class SparseTable:
+    # O(1) range min/max: levels[j][i] holds op over values[i:i + 2**j].
+    # NaNs are ignored (fmin/fmax) so gaps in a series don't poison a range.
+    def __init__(self, values, op):
+        self.op = op
+        self.levels = [np.asarray(values, dtype="float64")]
+        self._build_from(0)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def _build_from(self, start):
+        # (Re)compute every entry that depends on values[start:]
+        n = len(self)
+        j = 1
+        while (1 << j) <= n:
+            half = 1 << (j - 1)
+            prev = self.levels[j - 1]
+            lo, end = max(start - (1 << j) + 1, 0), n - (1 << j) + 1
+            tail = self.op(prev[lo:end], prev[lo + half:end + half])
+            if j < len(self.levels):
+                self.levels[j] = np.concatenate([self.levels[j][:lo], tail])
+            else:
+                self.levels.append(tail)
+            j += 1
+        del self.levels[j:]
+
+    def truncate(self, n):
+        self.levels = [level[:max(n - (1 << j) + 1, 0)] for j, level in enumerate(self.levels)]
+        while len(self.levels) > 1 and len(self.levels[-1]) == 0:
+            self.levels.pop()
+
+    def extend(self, values):
+        start = len(self)
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype="float64")])
+        self._build_from(start)
+
+    def query(self, lo, hi):
+        # op over values[lo:hi]; caller guarantees lo < hi
+        j = int(hi - lo).bit_length() - 1
+        return self.op(self.levels[j][lo], self.levels[j][hi - (1 << j)])
+
+class RangeIndex:
+    # Visible-range Low/High lookups over a bar history keyed by timestamp
+    def __init__(self, data, low_col="Low", high_col="High"):
+        self.low_col, self.high_col = low_col, high_col
+        self.lock = Lock()
+        self.version = _version(data, low_col, high_col)
+        self.times = epoch_ns(data.index)
+        self.low = SparseTable(data[low_col].to_numpy(), np.fmin)
+        self.high = SparseTable(data[high_col].to_numpy(), np.fmax)
+
+    def __len__(self):
+        return len(self.times)
+
+    def update(self, data):
+        # Bars only ever get appended, and the last stored bar may be replaced when it was
+        # partial, so keep everything before it and rebuild from there
+        self.version = _version(data, self.low_col, self.high_col)
+        times = epoch_ns(data.index)
+        keep = min(len(self) - 1, len(times))
+        if keep <= 0 or times[0] != self.times[0] or times[keep - 1] != self.times[keep - 1]:
+            self.times = times
+            self.low = SparseTable(data[self.low_col].to_numpy(), np.fmin)
+            self.high = SparseTable(data[self.high_col].to_numpy(), np.fmax)
+            return self
+        self.times = np.concatenate([self.times[:keep], times[keep:]])
+        for table, col in ((self.low, self.low_col), (self.high, self.high_col)):
+            table.truncate(keep)
+            table.extend(data[col].to_numpy()[keep:])
+        return self
+
+    def positions(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.times, start.value))
+        hi = len(self) if end is None else int(np.searchsorted(self.times, end.value, side="right"))
+        return lo, hi
+
+    def minmax(self, start=None, end=None):
+        with self.lock:
+            lo, hi = self.positions(start, end)
+            if lo >= hi:
+                return None
+            return self.low.query(lo, hi), self.high.query(lo, hi)
+
+def _version(data, low_col, high_col):
+    # data_version covers appends and a new last Close; a partial last bar can also get a
+    # new High or Low under the same timestamp and Close
+    if data.empty:
+        return data_version(data)
+    return (*data_version(data), float(data[low_col].iloc[-1]), float(data[high_col].iloc[-1]))
+
+# One index per ticker, shared by every chart drawing that ticker
+RANGE_INDEXES = TTLCache(maxsize=64, ttl=24 * 60 * 60, name="range_index")
+
+def range_index(ticker_symbol, data):
+    low_col = "Low" if "Low" in data.columns else "Close"
+    high_col = "High" if "High" in data.columns else "Close"
+    key = (ticker_symbol.upper(), low_col, high_col)
+    index = RANGE_INDEXES.get(key)
+    if index is None or not len(index):
+        index = RangeIndex(data, low_col, high_col)
+        RANGE_INDEXES.set(key, index)
+    elif index.version != _version(data, low_col, high_col):
+        with index.lock:
+            index.update(data)
+    return index
@@ -0,0 +1,30 @@
+import pandas as pd
+
+# Bar intervals the app can show. Only "1m" and "1d" are fetched from upstream; the others
+# are resampled locally from the stored bars of their source interval.
+INTERVALS = {"1m": None, "5m": "1m", "1h": "1m", "1d": None, "1wk": "1d"}
+INTRADAY = ("1m", "5m", "1h")
+RULES = {"5m": "5min", "1h": "1h", "1wk": "W-MON"}
+
+# How each column is aggregated into a coarser bar; anything else keeps the last value
+AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last",
+                "Volume": "sum", "Dividends": "sum", "Stock Splits": "max"}
+
+def resample_bars(bars, interval):
+    # Left-labelled bins ([09:30, 09:35) -> 09:30, weeks by their Monday); bins without
+    # any source bar (nights, weekends, holidays) are dropped
+    if bars.empty:
+        return bars
+    how = {col: AGGREGATIONS.get(col, "last") for col in bars.columns}
+    out = bars.resample(RULES[interval], label="left", closed="left").agg(how)
+    return out[out["Open"].notna()] if "Open" in out.columns else out.dropna(how="all")
+
+def resample_tail(bars, interval, cached, resume):
+    # Extend a previous result: only source rows from the start of its last (possibly
+    # partial) bin onwards are resampled again. `resume` is 0 when the source changed
+    # anywhere but its tail, forcing a full pass.
+    if cached is None or cached.empty or not resume:
+        return resample_bars(bars, interval)
+    cutoff = cached.index[-1]
+    tail = resample_bars(bars.iloc[bars.index.searchsorted(cutoff):], interval)
+    return pd.concat([cached.iloc[:-1], tail])
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import pandas as pd
+from .cache import TTLCache
+from .data import HISTORY_START, REFRESH_SECONDS, get_histories
+
+# Risk and return across a whole universe at once: every statistic is computed on one
+# date-aligned returns matrix (dates x tickers), never ticker by ticker.
+TRADING_DAYS = 252
+BENCHMARK = os.environ.get("STOCK_BENCHMARK", "SPY")
+# Annual rate subtracted from returns for the Sharpe ratio, e.g. 0.04
+RISK_FREE_RATE = float(os.environ.get("STOCK_RISK_FREE_RATE", "0"))
+BETA_WINDOW = 63  # about three months of sessions
+# Correlations over fewer common sessions than this are left blank
+MIN_OVERLAP = 20
+# Universe -> analytics; bars change at most every REFRESH_SECONDS
+RISK_CACHE = TTLCache(maxsize=32, ttl=REFRESH_SECONDS, name="risk")
+
+def returns_matrix(closes):
+    # Daily simple returns; a session a ticker didn't trade between its first and last
+    # close counts as flat, and everything outside that span (before a listing, after a
+    # delisting or halt) stays NaN rather than adding zero returns
+    filled = closes.ffill()
+    return filled.where(closes.bfill().notna()).pct_change(fill_method=None).iloc[1:]
+
+def annualized_return(closes):
+    # Compound growth over each ticker's own span of sessions
+    first = closes.bfill().iloc[0].to_numpy()
+    last = closes.ffill().iloc[-1].to_numpy()
+    sessions = closes.notna().sum().to_numpy() - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(sessions > 0, (last / first) ** (TRADING_DAYS / sessions) - 1, np.nan)
+    return pd.Series(growth, index=closes.columns)
+
+def max_drawdown(closes):
+    prices = closes.ffill()
+    return (prices / prices.cummax() - 1).min()
+
+def sharpe_ratio(returns, risk_free=RISK_FREE_RATE):
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    return (returns.mean() * TRADING_DAYS - risk_free) / volatility.where(volatility > 0)
+
+def _window_sums(a, window):
+    # Trailing `window`-row sums down each column, from one cumulative sum
+    sums = np.cumsum(a, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums
+
+def beta(returns, benchmark, window=None):
+    # cov(r, b) / var(b) over the sessions each ticker shares with the benchmark; with
+    # `window` a rolling beta (dates x tickers), otherwise one value per ticker
+    b = benchmark.reindex(returns.index).to_numpy()[:, None]
+    r = returns.to_numpy()
+    both = ~np.isnan(r) & ~np.isnan(b)
+    x, y = np.where(both, r, 0.0), np.where(both, b, 0.0)
+    if window:
+        def total(a):
+            return _window_sums(a, window)
+    else:
+        def total(a):
+            return a.sum(axis=0)
+    n = total(both.astype(float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x, mean_y = total(x) / n, total(y) / n
+        cov = total(x * y) / n - mean_x * mean_y
+        var = total(y * y) / n - mean_y * mean_y
+        values = np.where((n >= (window or 2) // 2) & (var > 0), cov / var, np.nan)
+    if window:
+        return pd.DataFrame(values, index=returns.index, columns=returns.columns)
+    return pd.Series(values, index=returns.columns)
+
+def correlation_matrix(returns, min_overlap=MIN_OVERLAP):
+    # Pairwise-complete Pearson correlation from a few matrix products (BLAS) instead
+    # of a loop over ticker pairs. sums[i, j] is the sum of i's returns over the
+    # sessions j also has; n[i, j] the number of sessions both have.
+    valid = returns.notna().to_numpy()
+    mask = valid.astype(float)
+    x = np.where(valid, returns.to_numpy(), 0.0)
+    n = mask.T @ mask
+    sums = x.T @ mask
+    squares = (x * x).T @ mask
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = x.T @ x - sums * sums.T / n
+        var = squares - sums * sums / n
+        corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+    corr[n < min_overlap] = np.nan
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+def risk_metrics(closes, returns, benchmark_returns=None, risk_free=RISK_FREE_RATE):
+    # (one row per ticker, rolling beta): annualized return and volatility, max drawdown,
+    # Sharpe, and with a benchmark the full-period and latest rolling beta
+    stats = pd.DataFrame({
+        "return": annualized_return(closes),
+        "volatility": returns.std() * np.sqrt(TRADING_DAYS),
+        "drawdown": max_drawdown(closes),
+        "sharpe": sharpe_ratio(returns, risk_free),
+    })
+    rolling = None
+    if benchmark_returns is not None:
+        rolling = beta(returns, benchmark_returns, BETA_WINDOW)
+        stats["beta"] = beta(returns, benchmark_returns)
+        stats["beta_recent"] = rolling.ffill().iloc[-1]
+    return stats.replace([np.inf, -np.inf], np.nan), rolling
+
+def _risk_analytics(tickers, benchmark, start):
+    closes = get_histories(list(tickers) + [benchmark], start)
+    selected = [t for t in tickers if t in closes.columns]
+    if not selected:
+        return None
+    bench = returns_matrix(closes[[benchmark]])[benchmark] if benchmark in closes.columns else None
+    closes = closes[selected].dropna(how="all")
+    returns = returns_matrix(closes)
+    stats, rolling = risk_metrics(closes, returns, bench)
+    return {
+        "benchmark": benchmark if bench is not None else None,
+        "stats": stats,
+        "rolling_beta": rolling,
+        "correlation": correlation_matrix(returns),
+    }
+
+def risk_analytics(tickers, benchmark=BENCHMARK, start=HISTORY_START):
+    tickers = tuple(dict.fromkeys(t for t in tickers if t))
+    if not tickers:
+        return None
+    return RISK_CACHE.get_or_fetch((tickers, benchmark, str(start)),
+                                   lambda: _risk_analytics(tickers, benchmark, start))
+
+RISK_COLUMNS = ["Rank", "Ticker", "Annual return %", "Volatility %", "Max drawdown %",
+                "Sharpe", "Beta", "Beta (3m)"]
+
+def risk_summary(analytics):
+    # RISK_COLUMNS rows, best Sharpe ratio first
+    stats = analytics["stats"].sort_values("sharpe", ascending=False, na_position="last")
+    percent = stats[["return", "volatility", "drawdown"]].mul(100).round(2)
+    rows = []
+    for rank, ticker in enumerate(stats.index, start=1):
+        rows.append({
+            "Rank": rank,
+            "Ticker": ticker,
+            "Annual return %": _value(percent.at[ticker, "return"]),
+            "Volatility %": _value(percent.at[ticker, "volatility"]),
+            "Max drawdown %": _value(percent.at[ticker, "drawdown"]),
+            "Sharpe": _value(round(stats.at[ticker, "sharpe"], 2)),
+            "Beta": _value(round(stats.at[ticker, "beta"], 2)) if "beta" in stats else None,
+            "Beta (3m)": _value(round(stats.at[ticker, "beta_recent"], 2)) if "beta_recent" in stats else None,
+        })
+    return rows
+
+def _value(number):
+    return None if pd.isna(number) else float(number) + 0.0  # no "-0.0"
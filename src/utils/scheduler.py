@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Quotes (ticker.info) are refreshed every N minutes; daily bars once per weekday after the close
+QUOTE_REFRESH_SECONDS = int(os.environ.get("STOCK_QUOTE_REFRESH_MINUTES", "5")) * 60
+MARKET_TZ = ZoneInfo("America/New_York")
+BARS_REFRESH_AFTER = (16, 15)
+# Besides the defaults and STOCK_WATCHLIST, keep this many of the most-requested tickers warm
+HOT_TICKERS = int(os.environ.get("STOCK_WARM_TOP", "20"))
+TICK_SECONDS = 30
+
+def _data():
+    # Imported on the scheduler thread, so starting it doesn't wait for pandas
+    from . import data
+    return data
+
+def _watchlist():
+    return [t.strip().upper() for t in os.environ.get("STOCK_WATCHLIST", "").split(",") if t.strip()]
+
+def _last_close(now):
+    # Most recent weekday session end (plus a buffer for the final bar to settle)
+    close = now.replace(hour=BARS_REFRESH_AFTER[0], minute=BARS_REFRESH_AFTER[1], second=0, microsecond=0)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+class RefreshScheduler:
+    def __init__(self, tickers=()):
+        self.base = [t.upper() for t in tickers] + _watchlist()
+        self._stop = threading.Event()
+        self._thread = None
+        self._quotes_at = 0.0
+        self._bars_for = None
+
+    def tickers(self):
+        return list(dict.fromkeys(self.base + _data().hot_tickers(HOT_TICKERS)))
+
+    def _each(self, fn, tickers, **kwargs):
+        def run(ticker):
+            try:
+                fn(ticker, **kwargs)
+            except Exception:
+                logger.warning("scheduled %s(%s) failed", fn.__name__, ticker, exc_info=True)
+        with ThreadPoolExecutor(max_workers=_data().HISTORY_WORKERS) as pool:
+            list(pool.map(run, tickers))
+
+    # Every worker process runs a scheduler, so each refresh skips what another worker
+    # already did: bars whose store was checked after the last close, quotes fetched
+    # within the last half period. Concurrent refreshes of one ticker share one fetch.
+    def _refresh_quotes(self, tickers):
+        self._each(_data().refresh_metrics, tickers, since=time.time() - QUOTE_REFRESH_SECONDS / 2)
+        self._quotes_at = time.monotonic()
+
+    def _refresh_bars(self, tickers, close):
+        self._each(_data().refresh_history, tickers, since=close.timestamp())
+        self._bars_for = close
+
+    def warm(self):
+        tickers = self.tickers()
+        self._refresh_bars(tickers, _last_close(datetime.now(MARKET_TZ)))
+        self._refresh_quotes(tickers)
+
+    def tick(self):
+        if time.monotonic() - self._quotes_at >= QUOTE_REFRESH_SECONDS:
+            self._refresh_quotes(self.tickers())
+        close = _last_close(datetime.now(MARKET_TZ))
+        if close != self._bars_for:
+            self._refresh_bars(self.tickers(), close)
+
+    def _run(self):
+        self.warm()
+        while not self._stop.wait(TICK_SECONDS):
+            self.tick()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+_scheduler = None
+
+def start_scheduler(tickers=()):
+    # One per process; STOCK_SCHEDULER=off disables it (tests, benchmarks, batch jobs)
+    global _scheduler
+    if os.environ.get("STOCK_SCHEDULER", "on").lower() in ("0", "off", "false"):
+        return None
+    if _scheduler is None:
+        _scheduler = RefreshScheduler(tickers).start()
+    return _scheduler
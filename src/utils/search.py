@@ -0,0 +1,76 @@
+import bisect
+import csv
+import os
+from .cache import TTLCache
+
+SYMBOLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "symbols.csv")
+MAX_RESULTS = 10
+
+# Symbol -> display label for anything seen via search (bounded; long-lived workers)
+SEARCH_CACHE = TTLCache(maxsize=4096, ttl=7 * 24 * 60 * 60, shared="labels")
+# Query -> remote results, only consulted when the local index has no match
+REMOTE_CACHE = TTLCache(maxsize=1024, ttl=24 * 60 * 60, shared="search")
+
+class SymbolIndex:
+    # Sorted-array prefix index over lower-cased symbols, full names and name words.
+    # A prefix lookup is two bisections plus a scan of the matching run.
+    def __init__(self, rows=()):
+        self.labels = {}
+        entries = []
+        for symbol, name in rows:
+            self.labels[symbol] = name
+            entries.append((symbol.lower(), 0, symbol))
+            entries.append((name.lower(), 2, symbol))
+            for word in name.lower().split()[1:]:
+                entries.append((word, 3, symbol))
+        entries.sort()
+        self.keys = [e[0] for e in entries]
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path=SYMBOLS_PATH):
+        try:
+            with open(path, newline="") as f:
+                return cls((row["symbol"], row["name"]) for row in csv.DictReader(f))
+        except OSError:
+            return cls()
+
+    def search(self, query, limit=MAX_RESULTS):
+        prefix = query.strip().lower()
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        # Exact symbol first, then symbol prefixes, then name matches
+        ranked = sorted(
+            (1 if rank == 0 and key != prefix else rank, len(symbol), symbol)
+            for key, rank, symbol in self.entries[lo:hi]
+        )
+        results = []
+        for _, _, symbol in ranked:
+            if symbol not in results:
+                results.append(symbol)
+                if len(results) == limit:
+                    break
+        return [(symbol, self.labels[symbol]) for symbol in results]
+
+SYMBOL_INDEX = SymbolIndex.load()
+
+def search_symbols(query):
+    results = SYMBOL_INDEX.search(query)
+    if results:
+        return results
+    def fetch():
+        from .gateway import upstream_call  # providers (and pandas) load on first remote search
+        return upstream_call("search", query, MAX_RESULTS)
+
+    try:
+        results = REMOTE_CACHE.get_or_fetch(query.strip().lower(), fetch)
+    except Exception:
+        return []
+    for sym, label in results:
+        SEARCH_CACHE.set(sym, label)
+    return results
+
+def symbol_label(symbol, default=None):
+    return SEARCH_CACHE.get(symbol) or SYMBOL_INDEX.labels.get(symbol) or default
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import time
+
+# pandas is imported by the functions that read and write bars, so modules that only
+# need STORE_DIR (cache backends, background jobs) don't pay for it at startup.
+# One Parquet partition per ticker/interval: <STORE_DIR>/interval=1d/AAPL.parquet
+STORE_DIR = os.environ.get(
+    "STOCK_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "bars")
+)
+
+def _partition_path(ticker_symbol, interval, ext="parquet"):
+    name = ticker_symbol.upper().replace("/", "_")
+    return os.path.join(STORE_DIR, f"interval={interval}", f"{name}.{ext}")
+
+def _replace(path, write):
+    # Unique temp file per writer (threads and processes), then an atomic rename
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+def read_bars(ticker_symbol, interval="1d"):
+    path = _partition_path(ticker_symbol, interval)
+    if not os.path.exists(path):
+        return None
+    import pandas as pd
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+def write_bars(ticker_symbol, bars, interval="1d", start=None):
+    import pandas as pd
+    bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+    _replace(_partition_path(ticker_symbol, interval), bars.to_parquet)
+    meta = read_meta(ticker_symbol, interval)
+    if start is not None:
+        meta["start"] = str(pd.Timestamp(start).date())
+    touch(ticker_symbol, interval, meta)
+    return bars
+
+def append_bars(ticker_symbol, bars, interval="1d", start=None):
+    stored = read_bars(ticker_symbol, interval)
+    if stored is None or stored.empty:
+        # A first write records its coverage, or the next read would see none and redownload
+        if start is None and bars is not None and not bars.empty:
+            start = bars.index[0].replace(tzinfo=None)
+        return write_bars(ticker_symbol, bars, interval, start=start)
+    if bars is None or bars.empty:
+        touch(ticker_symbol, interval)
+        return stored
+    import pandas as pd
+    return write_bars(ticker_symbol, pd.concat([stored, bars]), interval)
+
+# Sidecar metadata: the requested coverage start and when upstream was last checked
+def read_meta(ticker_symbol, interval="1d"):
+    try:
+        with open(_partition_path(ticker_symbol, interval, "json")) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def touch(ticker_symbol, interval="1d", meta=None):
+    meta = dict(meta if meta is not None else read_meta(ticker_symbol, interval))
+    meta["checked"] = time.time()
+
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+    _replace(_partition_path(ticker_symbol, interval, "json"), write)
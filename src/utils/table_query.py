@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from .cache import TTLCache
+from .indicators import data_version
+
+# Server-side paging/sorting/filtering for DataTables with page_action="custom".
+# The row order for a (series, version, filter, sort) is computed once as an array of
+# positions; every page request afterwards is a slice of it.
+
+# DataTable filter_query operators, longest first so ">=" isn't read as ">"
+OPERATORS = [("s>=", "ge"), ("s<=", "le"), (">=", "ge"), ("<=", "le"), ("!=", "ne"),
+             ("s>", "gt"), ("s<", "lt"), ("s=", "eq"), ("ge ", "ge"), ("le ", "le"),
+             ("lt ", "lt"), ("gt ", "gt"), ("ne ", "ne"), ("eq ", "eq"), ("contains ", "contains"),
+             ("datestartswith ", "datestartswith"), (">", "gt"), ("<", "lt"), ("=", "eq")]
+
+ORDER_CACHE = TTLCache(maxsize=256, ttl=10 * 60, name="table_order")
+
+def _split_part(part):
+    for token, op in OPERATORS:
+        if token in part:
+            name, value = part.split(token, 1)
+            name = name[name.find("{") + 1:name.rfind("}")]
+            value = value.strip()
+            if value and value[0] == value[-1] and value[0] in "'\"`":
+                value = value[1:-1].replace("\\" + value[0], value[0])
+            # Kept as typed: only a numeric comparison on a numeric column reads it as a number
+            return name, op, value
+    return None, None, None
+
+def _compare(values, op, value):
+    if op == "eq":
+        return values == value
+    if op == "ne":
+        return values != value
+    if op == "gt":
+        return values > value
+    if op == "ge":
+        return values >= value
+    if op == "lt":
+        return values < value
+    if op == "le":
+        return values <= value
+    raise ValueError(op)
+
+def _date_mask(index, date_labels, op, value):
+    if op == "datestartswith":
+        return date_labels(index).str.startswith(value)
+    if op == "contains":
+        return date_labels(index).str.contains(value, regex=False)
+    value = pd.Timestamp(value)
+    if index.tz is not None and value.tz is None:
+        value = value.tz_localize(index.tz)
+    return _compare(index, op, value)
+
+def filter_mask(frame, filter_query, date_labels):
+    # Boolean row mask for a DataTable filter_query ("{Close} > 100 && {Date} datestartswith 2024");
+    # clauses that don't parse, or name an unknown column, are ignored. `date_labels(index)`
+    # formats dates as shown in the table, and is only called for text matches on Date.
+    mask = np.ones(len(frame), dtype=bool)
+    for part in (filter_query or "").split(" && "):
+        name, op, value = _split_part(part)
+        if name is None:
+            continue
+        try:
+            if name == "Date":
+                mask &= np.asarray(_date_mask(frame.index, date_labels, op, value))
+            elif name in frame.columns:
+                values = frame[name]
+                if op == "contains":
+                    mask &= values.astype(str).str.contains(value, regex=False).to_numpy()
+                elif op != "datestartswith" and pd.api.types.is_numeric_dtype(values):
+                    mask &= _compare(values.to_numpy(), op, float(value))
+        except (TypeError, ValueError):
+            continue
+    return mask
+
+def row_order(frame, filter_query, sort_by, date_labels, default_descending=True):
+    positions = np.flatnonzero(filter_mask(frame, filter_query, date_labels))
+    if not sort_by:
+        return positions[::-1] if default_descending else positions
+    # Stable multi-column sort: the last key first, ending with the primary one
+    for spec in reversed(sort_by):
+        col = spec["column_id"]
+        if col == "Date":
+            keys = frame.index.asi8[positions]
+        elif col in frame.columns:
+            keys = frame[col].to_numpy()[positions]
+        else:
+            continue
+        # Every sortable column is numeric (dates as epoch ints), so descending is a negated key
+        if spec.get("direction") == "desc":
+            keys = -keys
+        positions = positions[np.argsort(keys, kind="stable")]
+    return positions
+
+def cached_order(key, frame, filter_query, sort_by, date_labels):
+    cache_key = (key, data_version(frame), filter_query or "",
+                 tuple((s["column_id"], s.get("direction")) for s in sort_by or []))
+    return ORDER_CACHE.get_or_fetch(cache_key, lambda: row_order(frame, filter_query, sort_by, date_labels))
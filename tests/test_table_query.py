@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from utils.table_query import filter_mask
+
+def _frame():
+    index = pd.date_range("2023-12-01", "2024-02-29", freq="B", tz="America/New_York")
+    return pd.DataFrame({"Close": np.linspace(90.0, 110.0, len(index))}, index=index)
+
+def _labels(index):
+    return index.strftime("%Y-%m-%d")
+
+def _in_2024(frame):
+    return int((frame.index.year == 2024).sum())
+
+def test_date_year_only_prefix():
+    frame = _frame()
+    assert filter_mask(frame, "{Date} datestartswith 2024", _labels).sum() == _in_2024(frame)
+    assert filter_mask(frame, "{Date} datestartswith 2024-", _labels).sum() == _in_2024(frame)
+
+def test_date_contains_year():
+    frame = _frame()
+    assert filter_mask(frame, "{Date} contains 2024", _labels).sum() == _in_2024(frame)
+
+def test_numeric_comparison_and_date_range():
+    frame = _frame()
+    assert filter_mask(frame, "{Close} >= 100", _labels).sum() == int((frame["Close"] >= 100).sum())
+    mask = filter_mask(frame, "{Close} < 100 && {Date} >= 2024-01-01", _labels)
+    assert mask.sum() == int(((frame["Close"] < 100) & (frame.index.year == 2024)).sum())